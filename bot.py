@@ -4,22 +4,25 @@ Handles initialization and configuration for the Telegram bot.
 """
 
 # Standard library imports
-import json
+import asyncio
 import logging
 import os
 import re
 import secrets
+import threading
 import traceback
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from functools import wraps
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache, wraps
 from http import HTTPStatus
-from typing import Dict, List, Optional, Union, Any, Coroutine
+from typing import Dict, List, Optional, Tuple, Union, Any, Coroutine
 
 # Third-party imports
+import orjson
 import pytz
 from fastapi import FastAPI, Response, Request, HTTPException
-from fuzzywuzzy import fuzz
+from fastapi.responses import ORJSONResponse
 from google.auth.transport.requests import Request as GoogleRequest
 from google.cloud import secretmanager
 from google.oauth2 import service_account
@@ -27,8 +30,8 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from rapidfuzz import fuzz, process
 from starlette.responses import HTMLResponse
-from tabulate import tabulate
 from telegram import ReplyKeyboardRemove, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, CallbackContext
 
@@ -47,15 +50,31 @@ IST_TIMEZONE = "Asia/Kolkata"
 SHEET_START_ROW = 8
 SHEET_END_ROW = 200
 FUZZY_MATCH_THRESHOLD = 75
+# Expense columns: B date, C desc, D amount, E main type, F sub type, G user, H bot identified
+EXPENSE_RANGE = f"B{SHEET_START_ROW}:J{SHEET_END_ROW}"
+EXPENSE_TYPES_RANGE = f"B{SHEET_START_ROW}:F{SHEET_END_ROW}"
+EXPENSE_AMOUNTS_RANGE = f"B{SHEET_START_ROW}:D{SHEET_END_ROW}"
+CARD_RANGE = "T8:W13"
 REMINDER_DATE_RANGE_SEPARATOR = "-"
 MAX_RESULTS_DISPLAY = 10
+KEYWORDS_JSON = "keywords.json"
+# keywords.json categories in priority order, with the types they map to
+KEYWORD_CATEGORIES = (
+    ("food", ("Food", "Outside Food/Dining/Snacks")),
+    ("groceries", ("Household", "Groceries")),
+)
+_IST = pytz.timezone(IST_TIMEZONE)
+# "<description> <amount> [<amount> ...]", e.g. "Groceries 120 45.5"; [^\S\r\n] keeps a match within one line,
+# the description starts with a letter or digit, amounts are separated by whitespace and \r? accepts CRLF line endings
+_EXPENSE_PATTERN = r'^[^\S\r\n]*([a-zA-Z0-9][a-zA-Z0-9 ]*?)[^\S\r\n]+(\d+(?:\.\d+)?(?:[^\S\r\n]+\d+(?:\.\d+)?)*)[^\S\r\n]*\r?$'
+_EXPENSE_RE = re.compile(_EXPENSE_PATTERN, re.IGNORECASE)
+_EXPENSE_LINES_RE = re.compile(_EXPENSE_PATTERN, re.IGNORECASE | re.MULTILINE)
 
 
 # Utility functions
 def ist_date() -> datetime:
     """Returns current datetime in IST timezone."""
-    ist = pytz.timezone(IST_TIMEZONE)
-    return datetime.now(ist)
+    return datetime.now(_IST)
 
 
 class Config:
@@ -83,6 +102,11 @@ class Config:
         self.scopes = ["https://www.googleapis.com/auth/spreadsheets"]
         self.sheet_range = "!B8:E8"
         self.current_month = self._get_current_month()
+        self.expense_range = f"{self.current_month}!{EXPENSE_RANGE}"
+        self.expense_types_range = f"{self.current_month}!{EXPENSE_TYPES_RANGE}"
+        self.expense_amounts_range = f"{self.current_month}!{EXPENSE_AMOUNTS_RANGE}"
+        self.card_range = f"{self.current_month}!{CARD_RANGE}"
+        self.append_range = f"{self.current_month}{self.sheet_range}"
         
         logger.info("Current month set to: %s", self.current_month)
     
@@ -149,6 +173,14 @@ if config:
     )
 
 _data_cache: Dict[str, Dict[str, str]] = {}
+_data_cache_keys: List[str] = []
+_file_cache: Dict[str, Tuple[int, Any]] = {}
+_sheets_service = None
+# The Sheets client's HTTP session is not thread-safe; reads and writes run in worker threads,
+# so only those threads ever wait on this lock and the event loop keeps serving other users
+_sheets_lock = threading.Lock()
+_creds: Optional[service_account.Credentials] = None
+_keyword_index: Optional[Tuple[Any, Dict[str, int]]] = None
 
 
 @asynccontextmanager
@@ -166,7 +198,7 @@ async def lifespan(_: FastAPI):
         await bot_builder.stop()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 @app.get("/bot", response_class=HTMLResponse)
@@ -187,6 +219,10 @@ async def read_items():
 class ExpenseItem:
     """Represents an expense item with all its properties."""
     
+    __slots__ = (
+        "row_id", "date", "desc", "amount", "main_type", "sub_type", "user", "bot_identified", "numeric_amount"
+    )
+    
     def __init__(
         self, 
         row_id: int, 
@@ -206,6 +242,7 @@ class ExpenseItem:
         self.sub_type = sub_type
         self.user = user
         self.bot_identified = bot_identified
+        self.numeric_amount = self._parse_amount(amount)
 
     def __repr__(self) -> str:
         return (
@@ -215,43 +252,56 @@ class ExpenseItem:
             f"bot_identified='{self.bot_identified}')"
         )
     
-    @property
-    def numeric_amount(self) -> float:
+    @staticmethod
+    def _parse_amount(amount: str) -> float:
         """Convert amount string to float, removing commas."""
         try:
-            return float(self.amount.replace(",", "")) if self.amount else 0.0
+            return float(amount.replace(",", "")) if amount else 0.0
         except (ValueError, AttributeError):
             return 0.0
 
 
-def get_expense_data() -> Union[List[ExpenseItem], str]:
-    """Fetch expense data from Google Sheets."""
-    creds = get_creds()
+def _parse_expense_rows(values: List[List[str]]) -> List[ExpenseItem]:
+    """Convert raw expense rows from the sheet into ExpenseItem objects."""
+    exp_list = []
+    for row_id, item in enumerate(values, start=SHEET_START_ROW):
+        exp_list.append(ExpenseItem(
+            row_id=row_id,
+            date=item[0] if len(item) > 0 else "",
+            desc=item[1] if len(item) > 1 else "",
+            amount=item[2] if len(item) > 2 else "",
+            main_type=item[3] if len(item) > 3 else "",
+            sub_type=item[4] if len(item) > 4 else "",
+            user=item[5] if len(item) > 5 else "",
+            bot_identified=item[6] if len(item) > 6 else "No",
+        ))
+    return exp_list
+
+
+def _parse_card_rows(values: List[List[str]]) -> List[Dict[str, str]]:
+    """Convert raw credit card rows from the sheet into card dicts."""
+    card_list = []
+    for row in values:
+        if len(row) >= 4:  # Ensure we have all required fields
+            card_list.append({
+                "name": row[1],
+                "due_date": row[0],
+                "amount": row[2],
+                "status": row[3],
+            })
+    return card_list
+
+
+def get_expense_data(range_to_fetch: Optional[str] = None) -> Union[List[ExpenseItem], str]:
+    """Fetch expense data from Google Sheets, limited to range_to_fetch (all expense columns by default)."""
     try:
-        service = build("sheets", "v4", credentials=creds)
-        range_to_fetch = f"{config.current_month}!B8:J200"
-        result = (
+        service = _get_service()
+        range_to_fetch = range_to_fetch or config.expense_range
+        result = _execute(
             service.spreadsheets()
-            .values().get(spreadsheetId=config.google_sheet_id, range=range_to_fetch, alt="json").execute()
+            .values().get(spreadsheetId=config.google_sheet_id, range=range_to_fetch, alt="json", fields="values")
         )
-        row_id = SHEET_START_ROW
-        exp_list = []
-        values = result.get("values", [])
-        if not values:
-            return []
-        for item in values:
-            exp_list.append(ExpenseItem(
-                row_id=row_id,
-                date=item[0] if len(item) > 0 else "",
-                desc=item[1] if len(item) > 1 else "",
-                amount=item[2] if len(item) > 2 else "",
-                main_type=item[3] if len(item) > 3 else "",
-                sub_type=item[4] if len(item) > 4 else "",
-                user=item[5] if len(item) > 5 else "",
-                bot_identified=item[6] if len(item) > 6 else "No",
-            ))
-            row_id += 1
-        return exp_list
+        return _parse_expense_rows(result.get("values", []))
     except HttpError as e:
         logger.error(f"HTTP error occurred while fetching expenses: {e}")
         return f"Google Sheets API Error: {e}"
@@ -261,19 +311,48 @@ def get_expense_data() -> Union[List[ExpenseItem], str]:
         return f"Error! {e}"
 
 
+def _cached_json(path: str) -> Any:
+    """Load a JSON file, reusing the parsed content while its modification time is unchanged."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _file_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "rb") as file:
+        data = orjson.loads(file.read())
+    _file_cache[path] = (mtime, data)
+    return data
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    """Write JSON to a temporary file and move it over path, so a crash never leaves a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, path)
+
+
+def get_expense_types() -> Union[List[ExpenseItem], str]:
+    """Fetch expenses with only the date, description, amount and type columns."""
+    return get_expense_data(config.expense_types_range)
+
+
+def get_expense_dates_amounts() -> Union[List[ExpenseItem], str]:
+    """Fetch expenses with only the date, description and amount columns."""
+    return get_expense_data(config.expense_amounts_range)
+
+
 def applicable_reminders() -> List[Dict[str, Any]]:
     """Get reminders that are applicable for today based on date range."""
     today_reminders = []
     try:
-        with open(config.reminders_json, "r") as file:
-            reminders = json.load(file)
-            today = int(ist_date().strftime("%d"))
-            for rem in reminders:
-                date_range = rem.get("date_range", "")
-                if REMINDER_DATE_RANGE_SEPARATOR in date_range:
-                    _start, _end = map(int, date_range.split(REMINDER_DATE_RANGE_SEPARATOR))
-                    if _start <= today <= _end:
-                        today_reminders.append(rem)
+        reminders = _cached_json(config.reminders_json)
+        today = int(ist_date().strftime("%d"))
+        for rem in reminders:
+            date_range = rem.get("date_range", "")
+            if REMINDER_DATE_RANGE_SEPARATOR in date_range:
+                _start, _end = map(int, date_range.split(REMINDER_DATE_RANGE_SEPARATOR))
+                if _start <= today <= _end:
+                    today_reminders.append(rem)
     except FileNotFoundError:
         logger.warning(f"Reminders file not found: {config.reminders_json}")
     except (ValueError, KeyError) as e:
@@ -297,47 +376,48 @@ async def refresh_types_data_api(request: Request):
 
 async def refresh_types_data() -> Dict[str, str]:
     """Refresh types data cache and send user reminders."""
-    global _data_cache
     try:
         # types refresh
-        expense_list = get_expense_data()
+        expense_list = await asyncio.to_thread(get_expense_data)
         if isinstance(expense_list, str):  # Error case
             return {"status": "error", "message": expense_list}
             
-        filtered_list = [exp for exp in expense_list if exp.main_type and exp.sub_type and exp.bot_identified != "Yes"]
-        new_types = [{"desc": exp.desc, "main_type": exp.main_type, "sub_type": exp.sub_type} for exp in filtered_list]
-        
-        if os.path.exists(config.types_data_json):
-            with open(config.types_data_json, 'r') as file:
-                json_file = json.load(file)
-                existing_descs = {item.get('desc').lower() for item in json_file}
-                new_types = [item for item in new_types if item.get('desc').lower() not in existing_descs]
-                json_file.extend(new_types)
-                with open(config.types_data_json, 'w') as append_file:
-                    json.dump(json_file, append_file, indent=4)
+        existing_types = _cached_json(config.types_data_json) if os.path.exists(config.types_data_json) else []
+        # keyed by lowercased description, so duplicates collapse in a single pass
+        types_by_desc = {item.get('desc').lower(): item for item in existing_types}
+        new_types_count = 0
+        for exp in expense_list:
+            if exp.main_type and exp.sub_type and exp.bot_identified != "Yes":
+                desc_lower = exp.desc.lower()
+                if desc_lower not in types_by_desc:
+                    types_by_desc[desc_lower] = {"desc": exp.desc, "main_type": exp.main_type, "sub_type": exp.sub_type}
+                    new_types_count += 1
+
+        if new_types_count:
+            _write_json_atomic(config.types_data_json, list(types_by_desc.values()))
+            logger.info("Added %d new types to %s.", new_types_count, config.types_data_json)
         else:
-            json_file = new_types
-            with open(config.types_data_json, 'w') as new_file:
-                json.dump(json_file, new_file, indent=4)
+            logger.info("No new types found; skipping write of %s.", config.types_data_json)
 
-        json_file = [item for item in json_file if item.get('main_type') and item.get('sub_type')]
-        for item in json_file:
-            _data_cache[item.get('desc').lower()] = item
+        _load_types_cache(types_by_desc)
+        _detect_types_cached.cache_clear()
         logger.info("Types data refreshed & loaded successfully.")
 
         # user reminder to log expenses
-        today = ist_date().strftime("%d/%m")
-        today_exp = [exp for exp in expense_list if exp.date == today]
+        now = ist_date()
+        today = now.strftime("%d/%m")
+        today_users = [exp.user.lower() for exp in expense_list if exp.date == today]
+        messages = []
         for user in config.users:
-            user_exp = [exp for exp in today_exp if user["name"].lower() in exp.user.lower()]
-            if not user_exp:
-                await bot_builder.bot.send_message(
-                    chat_id=user["id"],
-                    text=f"<b>Hello {user['name']}, You haven't logged any expense today! \n Saving money staying indoors or just lazy to log expenses??</b>",
-                    parse_mode="HTML"
-                )
-
-        if ist_date().day == 28:
+            user_name = user["name"].lower()
+            if not any(user_name in exp_user for exp_user in today_users):
+                messages.append((
+                    user["id"],
+                    f"<b>Hello {user['name']}, You haven't logged any expense today! \n Saving money staying indoors or just lazy to log expenses??</b>"
+                ))
+        await broadcast_messages(messages)
+
+        if now.day == 28:
             await bot_builder.bot.send_message(
                 chat_id=config.ids_allowed_to_chat_with_bot[0],
                 text=f"<b>\n\n Hello {config.users[0]['name']}, A new sheet has been created for this month!</b>\n"
@@ -348,7 +428,7 @@ async def refresh_types_data() -> Dict[str, str]:
     except FileNotFoundError as e:
         logger.error(f"File not found while refreshing types data: {e}")
         return {"status": "error", "message": f"File not found: {e}"}
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"JSON decode error while refreshing types data: {e}")
         return {"status": "error", "message": f"JSON error: {e}"}
     except Exception as e:
@@ -370,23 +450,12 @@ async def types_refresh_by_command(update, context: ContextTypes.DEFAULT_TYPE):
 def get_credit_card_data() -> List[Dict[str, str]]:
     """Fetch credit card data from Google Sheets."""
     try:
-        service = build("sheets", "v4", credentials=get_creds())
-        range_to_fetch = f"{config.current_month}!T8:W13"
-        result = (
+        service = _get_service()
+        result = _execute(
             service.spreadsheets()
-            .values().get(spreadsheetId=config.google_sheet_id, range=range_to_fetch, alt="json").execute()
+            .values().get(spreadsheetId=config.google_sheet_id, range=config.card_range, alt="json", fields="values")
         )
-        values = result.get("values", [])
-        card_list = []
-        for row in values:
-            if len(row) >= 4:  # Ensure we have all required fields
-                card_list.append({
-                    "name": row[1],
-                    "due_date": row[0],
-                    "amount": row[2],
-                    "status": row[3],
-                })
-        return card_list
+        return _parse_card_rows(result.get("values", []))
     except HttpError as e:
         logger.error(f"HTTP error occurred while fetching credit card data: {e}")
         return []
@@ -395,6 +464,31 @@ def get_credit_card_data() -> List[Dict[str, str]]:
         return []
 
 
+def get_sheet_batch() -> Tuple[Union[List[ExpenseItem], str], List[Dict[str, str]]]:
+    """Fetch expense types and credit card data from Google Sheets in a single request."""
+    try:
+        service = _get_service()
+        result = _execute(
+            service.spreadsheets()
+            .values().batchGet(
+                spreadsheetId=config.google_sheet_id,
+                ranges=[config.expense_types_range, config.card_range],
+                majorDimension="ROWS",
+                fields="valueRanges(values)",
+            )
+        )
+        value_ranges = result.get("valueRanges", [{}, {}])
+        expenses = _parse_expense_rows(value_ranges[0].get("values", []))
+        cards = _parse_card_rows(value_ranges[1].get("values", []))
+        return expenses, cards
+    except HttpError as e:
+        logger.error(f"HTTP error occurred while fetching sheet data: {e}")
+        return f"Google Sheets API Error: {e}", []
+    except Exception as e:
+        logger.error(f"An error occurred while fetching sheet data: {e}")
+        return f"Error! {e}", []
+
+
 @app.get("/reminders")
 async def process_reminders_job(request: Request):
     """Process and send reminders to users."""
@@ -405,43 +499,65 @@ async def process_reminders_job(request: Request):
             raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Unauthorized")
 
     logger.info("Processing reminders job.")
-    open_reminders = await active_reminders()
+    exp_list, card_list = await asyncio.to_thread(get_sheet_batch)
+    if isinstance(exp_list, str):  # Error case
+        logger.error("Skipping expense reminders, could not fetch expenses: %s", exp_list)
+        open_reminders = []
+    else:
+        open_reminders = await active_reminders(exp_list)
     if open_reminders:
-        for user in config.ids_allowed_to_chat_with_bot:
-            logger.info("Sending reminders to user %s", user)
-            await bot_builder.bot.send_message(
-                chat_id=user,
-                text=f"<b>Hello, Gentle Reminder for the below expenses:</b> \n" + tabulate([[rem.get("desc")] for rem in open_reminders], tablefmt="plain"),
-                parse_mode="HTML"
-            )
-            logger.info("Reminders processed and sent to the user.")
+        logger.info("Sending reminders to users %s", config.ids_allowed_to_chat_with_bot)
+        text = "<b>Hello, Gentle Reminder for the below expenses:</b> \n" + format_reminders(open_reminders)
+        await broadcast_messages([(user, text) for user in config.ids_allowed_to_chat_with_bot])
+        logger.info("Reminders processed and sent to the users.")
     else:
         logger.info("No active reminders found.")
 
-    await handle_credit_card_reminders(update=None)
+    await handle_credit_card_reminders(update=None, card_list=card_list)
     return Response(status_code=HTTPStatus.OK)
 
 
+async def broadcast_messages(messages: List[Tuple[int, str]]) -> None:
+    """Send HTML messages to several chats concurrently, logging any failed sends."""
+    results = await asyncio.gather(
+        *(bot_builder.bot.send_message(chat_id=chat_id, text=text, parse_mode="HTML") for chat_id, text in messages),
+        return_exceptions=True,
+    )
+    for (chat_id, _), result in zip(messages, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to send message to chat %s: %s", chat_id, result)
+
+
 async def reminders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.message.from_user
     logger.info("User %s requested reminders.", user.first_name)
-    reminders_list = await active_reminders()
+    exp_list, card_list = await asyncio.to_thread(get_sheet_batch)
+    if isinstance(exp_list, str):  # Error case
+        await update.message.reply_text(f"An error occurred while fetching expenses! {exp_list}")
+        reminders_list = None
+    else:
+        reminders_list = await active_reminders(exp_list)
     if reminders_list:
-        await update.message.reply_text(text=f"<b>Today's Reminders:</b>\n" + tabulate([[rem.get("desc")] for rem in reminders_list], tablefmt="plain"),
+        await update.message.reply_text(text=f"<b>Today's Reminders:</b>\n" + format_reminders(reminders_list),
                                         parse_mode="HTML"
                                         )
-    else:
+    elif reminders_list is not None:
         await update.message.reply_text("No reminders for today for any fixed expenses. Enjoy your day!")
 
-    await handle_credit_card_reminders(update)
+    await handle_credit_card_reminders(update, card_list)
     return ConversationHandler.END
 
 
-async def handle_credit_card_reminders(update: Optional[Update]):
-    """Handle credit card payment reminders."""
+async def handle_credit_card_reminders(update: Optional[Update], card_list: Optional[List[Dict[str, str]]] = None):
+    """Handle credit card payment reminders, fetching card data unless it is provided."""
     # credit card payment reminders
-    card_list = get_credit_card_data()
+    if card_list is None:
+        card_list = await asyncio.to_thread(get_credit_card_data)
     logger.info("Processing credit card payment reminders." + str(card_list))
+    now = ist_date()
+    today = now.strftime("%d/%m")
+    tomorrow = (now + timedelta(days=1)).strftime("%d/%m")
+    messages = []
     for card in card_list:
         if card.get("status", "").lower() == "paid":
             logger.info("Skipping card %s as it is already paid. with status: %s ", card.get("name"), card.get("status"))
@@ -452,8 +568,6 @@ async def handle_credit_card_reminders(update: Optional[Update]):
             logger.error("Due date is missing for card: %s", card.get("name"))
             continue
         due_date_str = card.get("due_date")
-        today = ist_date().strftime("%d/%m")
-        tomorrow = (ist_date() + timedelta(days=1)).strftime("%d/%m")
         due_dates = {
             today: f"<b>Reminder: Your credit card payment for {card.get('name')} is due today - {today}, with amount {card.get('amount')}</b>",
             tomorrow: f"<b>Reminder: Your credit card payment for {card.get('name')} is due tomorrow - {tomorrow}.</b>"
@@ -465,38 +579,30 @@ async def handle_credit_card_reminders(update: Optional[Update]):
                                                 parse_mode="HTML")
                 continue
             for user in config.ids_allowed_to_chat_with_bot:
-                logger.info("Sending reminders to user %s", user)
-                await bot_builder.bot.send_message(
-                    chat_id=user,
-                    text=due_dates[due_date_str],
-                    parse_mode="HTML"
-                )
-                logger.info("Credit card payment reminder sent for card: %s", card.get("name"))
+                logger.info("Queueing credit card reminder for card %s to user %s", card.get("name"), user)
+                messages.append((user, due_dates[due_date_str]))
         else:
             logger.info("No reminder needed for card %s, due date: %s", card.get("name"), card.get("due_date"))
+    await broadcast_messages(messages)
 
 
-async def active_reminders() -> list:
+async def active_reminders(exp_list: Optional[List[ExpenseItem]] = None) -> list:
     """
     Returns a list of reminders that are applicable for today and have not yet been logged as expenses.
+    Expenses are fetched from the sheet unless already provided.
     Avoids modifying the reminder list while iterating.
     """
     reminders_list = applicable_reminders()
     if reminders_list:
-        exp_list = get_expense_data()
-        valid_expenses = [exp for exp in exp_list if exp.main_type != "" and exp.sub_type != ""]
-        logger.info("Valid expenses found: %s", valid_expenses)
-        filtered_reminders = []
-        for rem in reminders_list:
-            found = False
-            for exp in valid_expenses:
-                if exp.main_type == rem["main_type"] and exp.sub_type == rem["sub_type"]:
-                    logger.info("Expense already logged for reminder: %s", rem["desc"])
-                    found = True
-                    break
-            if not found:
-                logger.info("Reminder found: %s", rem)
-                filtered_reminders.append(rem)
+        if exp_list is None:
+            exp_list = await asyncio.to_thread(get_expense_types)
+        logged_pairs = {
+            (exp.main_type, exp.sub_type) for exp in exp_list if exp.main_type != "" and exp.sub_type != ""
+        }
+        filtered_reminders = [
+            rem for rem in reminders_list if (rem["main_type"], rem["sub_type"]) not in logged_pairs
+        ]
+        logger.info("Reminders found: %s", [rem["desc"] for rem in filtered_reminders])
         reminders_list = filtered_reminders
     else:
         logger.info("No applicable reminders found.")
@@ -513,7 +619,7 @@ async def process_update(request: Request):
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Unauthorized")
     
     logger.info("Valid secret token: %s", my_header)
-    message = await request.json()
+    message = orjson.loads(await request.body())
     update = Update.de_json(data=message, bot=bot_builder.bot)
     await bot_builder.process_update(update)
     return Response(status_code=HTTPStatus.OK)
@@ -538,11 +644,27 @@ def format_expenses_as_table(expenses: List[ExpenseItem]) -> str:
     if not expenses:
         return "No expenses to display."
     
-    table_data = [
-        [exp.desc, exp.amount]
-        for exp in expenses
-    ]
-    return tabulate(table_data, headers=["Description", "Amount"], tablefmt="plain")
+    desc_width = max(len("Description"), max(len(exp.desc) for exp in expenses))
+    amount_width = max(len("Amount"), max(len(str(exp.amount)) for exp in expenses))
+    lines = [f"{'Description':<{desc_width}}  {'Amount':>{amount_width}}"]
+    lines.extend(f"{exp.desc:<{desc_width}}  {str(exp.amount):>{amount_width}}" for exp in expenses)
+    return "\n".join(lines)
+
+
+def format_reminders(reminders: List[Dict[str, Any]]) -> str:
+    """Format reminders as one description per line."""
+    return "\n".join(rem.get("desc", "") for rem in reminders)
+
+
+def expenses_for_date(expenses: List[ExpenseItem], date: str) -> Tuple[List[ExpenseItem], float]:
+    """Return the expenses logged on the given date and their total, in a single pass."""
+    matching = []
+    total = 0.0
+    for exp in expenses:
+        if exp.date == date:
+            matching.append(exp)
+            total += exp.numeric_amount
+    return matching, total
 
 
 async def expense_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -550,21 +672,18 @@ async def expense_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.message.from_user
     logger.info("User %s requested summary.", user.first_name)
     try:
-        exp_list = get_expense_data()
+        exp_list = await asyncio.to_thread(get_expense_dates_amounts)
         if isinstance(exp_list, str):  # Error case
             await update.message.reply_text(f"An error occurred while fetching expenses! {exp_list}")
             return ConversationHandler.END
             
         today = ist_date().strftime("%d/%m")
-        today_expenses = [exp for exp in exp_list if exp.date == today]
+        today_expenses, total_expenses = expenses_for_date(exp_list, today)
         
         if not today_expenses:
             logger.info("No expenses found for today.")
             await update.message.reply_text("No expenses found for today.")
             return ConversationHandler.END
-            
-        # get total expenses for today
-        total_expenses = sum(exp.numeric_amount for exp in today_expenses)
         
         await update.message.reply_text(
             "<b>Today's Expenses:</b> \n\n" + format_expenses_as_table(today_expenses) + 
@@ -583,22 +702,22 @@ async def expense_summary_with_types(update: Update, context: ContextTypes.DEFAU
     user = update.message.from_user
     logger.info("User %s requested summary with types.", user.first_name)
     try:
-        exp_list = get_expense_data()
+        exp_list = await asyncio.to_thread(get_expense_types)
         if isinstance(exp_list, str):  # Error case
             await update.message.reply_text(f"An error occurred while fetching expenses! {exp_list}")
             return ConversationHandler.END
             
         today = ist_date().strftime("%d/%m")
-        today_expenses = [exp for exp in exp_list if exp.date == today]
+        today_expenses, _ = expenses_for_date(exp_list, today)
         
         if not today_expenses:
             logger.info("No expenses found for today.")
             await update.message.reply_text("No expenses found for today.")
             return ConversationHandler.END
 
-        img_name = create_image(today_expenses)
-        with open(img_name, "rb") as img_file:
-            await update.message.reply_document(document=img_file)
+        # rendering is CPU bound, keep it off the event loop
+        image = await asyncio.to_thread(create_image, today_expenses)
+        await update.message.reply_document(document=image, filename="expense_summary.png")
     except Exception as e:
         logger.error(f"An error occurred while creating expense summary: {e}")
         await update.message.reply_text(f"An error occurred while creating summary! {e}")
@@ -607,9 +726,20 @@ async def expense_summary_with_types(update: Update, context: ContextTypes.DEFAU
 
 
 def get_creds():
-    """Get Google Sheets API credentials."""
+    """Get Google Sheets API credentials.
+
+    The credentials are loaded once (from token.json locally, Secret Manager otherwise)
+    and then reused, refreshing their access token in place when it expires.
+    """
+    global _creds
+    if _creds is not None:
+        if _creds.expired:
+            _creds.refresh(GoogleRequest())
+        return _creds
+    
     if config.is_local:
-        return get_local_creds()
+        _creds = get_local_creds()
+        return _creds
     
     if not config.gcp_project_id or not config.gcp_secret_id:
         raise ValueError("GCP project ID and secret ID are required for non-local environments")
@@ -617,11 +747,31 @@ def get_creds():
     client = secretmanager.SecretManagerServiceClient()
     name = f"projects/{config.gcp_project_id}/secrets/{config.gcp_secret_id}/versions/2"
     response = client.access_secret_version(request={"name": name})
-    creds_info = json.loads(response.payload.data.decode("UTF-8"))
-    credentials = service_account.Credentials.from_service_account_info(
+    creds_info = orjson.loads(response.payload.data)
+    _creds = service_account.Credentials.from_service_account_info(
         creds_info, scopes=config.scopes
     )
-    return credentials
+    return _creds
+
+
+def _execute(request):
+    """Execute a Sheets API request, one at a time across threads."""
+    with _sheets_lock:
+        return request.execute()
+
+
+def _get_service():
+    """Return the Google Sheets service client, building it on first use.
+
+    The client keeps its authorized HTTP session, so later calls skip the
+    credential lookup and the discovery document load.
+    """
+    global _sheets_service
+    if _sheets_service is None:
+        _sheets_service = build(
+            "sheets", "v4", credentials=get_creds(), cache_discovery=False, static_discovery=True
+        )
+    return _sheets_service
 
 
 def get_local_creds():
@@ -633,7 +783,7 @@ def get_local_creds():
             creds.refresh(GoogleRequest())
     else:
         flow = InstalledAppFlow.from_client_config(
-            json.loads(config.sheets_creds), config.scopes
+            orjson.loads(config.sheets_creds), config.scopes
         )
         creds = flow.run_local_server(port=0)
         with open("token.json", "w") as auth_token:
@@ -641,36 +791,43 @@ def get_local_creds():
     return creds
 
 
-def update_google_sheet(amount: str, description: str, user: str) -> Union[Dict[str, Any], str]:
-    """Update Google Sheet with new expense entry."""
-    creds = get_creds()
+def update_google_sheet(amount: str, description: str, user: str) -> Tuple[bool, Union[Dict[str, Any], str]]:
+    """Update Google Sheet with new expense entry, returning (ok, API result or error message)."""
+    return update_google_sheet_batch([(amount, description)], user)
+
+
+def update_google_sheet_batch(entries: List[Tuple[str, str]], user: str) -> Tuple[bool, Union[Dict[str, Any], str]]:
+    """Append (amount, description) expense entries to the Google Sheet in a single request.
+
+    Returns (True, API result) on success and (False, error message) on failure.
+    """
     try:
-        service = build("sheets", "v4", credentials=creds)
-        range_to_update = f"{config.current_month}{config.sheet_range}"
+        service = _get_service()
         date_string = ist_date().strftime("%d/%m/%Y")
-        main_type, sub_type = detect_types(description)
-        bot_identified = "Yes" if main_type else "No"
-        values = [date_string, description, amount, main_type, sub_type, user, bot_identified],
+        values = []
+        for amount, description in entries:
+            main_type, sub_type = detect_types(description)
+            bot_identified = "Yes" if main_type else "No"
+            values.append([date_string, description, amount, main_type, sub_type, user, bot_identified])
         body = {"values": values}
-        result = (
+        result = _execute(
             service.spreadsheets()
             .values()
             .append(
                 spreadsheetId=config.google_sheet_id,
-                range=range_to_update,
+                range=config.append_range,
                 valueInputOption="USER_ENTERED",
                 body=body,
             )
-            .execute()
         )
         logger.info(f"{result.get('updates').get('updatedRange')} cells updated.")
-        return result
+        return True, result
     except HttpError as e:
         logger.error(f"HTTP error occurred while updating sheet: {e}")
-        return f"Google Sheets API Error: {e}"
+        return False, f"Google Sheets API Error: {e}"
     except Exception as e:
         logger.error(f"An error occurred while updating sheet: {e}")
-        return f"Error! {e}"
+        return False, f"Error! {e}"
 
 
 def restricted(func):
@@ -724,47 +881,85 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return 0
 
 
+def _load_types_cache(types_by_desc: Dict[str, Dict[str, str]]) -> None:
+    """Populate the types cache and its precomputed list of lookup keys.
+
+    Entries are keyed by their lowercased description; those without both types are skipped.
+    """
+    global _data_cache_keys
+    for desc_lower, item in types_by_desc.items():
+        if item.get('main_type') and item.get('sub_type'):
+            _data_cache[desc_lower] = item
+    _data_cache_keys = list(_data_cache.keys())
+
+
 def get_types_data() -> None:
     """Load types data into cache if not already loaded."""
-    global _data_cache
     if not _data_cache:
         try:
-            with open(config.types_data_json, 'r') as file:
-                json_file = json.load(file)
-                json_file = [item for item in json_file if item.get('main_type') and item.get('sub_type')]
-                for item in json_file:
-                    _data_cache[item.get('desc').lower()] = item
+            _load_types_cache({item.get('desc').lower(): item for item in _cached_json(config.types_data_json)})
         except FileNotFoundError:
             logger.warning(f"Types data file not found: {config.types_data_json}")
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Error parsing types data file: {e}")
         except Exception as e:
             logger.error(f"Unexpected error loading types data: {e}")
 
 
-def match_keywords(description: str, keywords: List[str]) -> bool:
-    """Check if description contains any of the given keywords."""
+def build_keyword_index(keywords: Dict[str, List[str]]) -> Dict[str, int]:
+    """Map each lowercased keyword to the priority of its KEYWORD_CATEGORIES entry."""
+    index: Dict[str, int] = {}
+    for priority, (category, _) in enumerate(KEYWORD_CATEGORIES):
+        for keyword in keywords.get(category, []):
+            index.setdefault(keyword.lower(), priority)
+    return index
+
+
+def match_keyword_types(description: str, index: Dict[str, int]) -> Optional[Tuple[str, str]]:
+    """Return the types of the highest-priority keyword category found in description, in one pass."""
     words = description.lower().split()
-    keywords_set = set(k.lower() for k in keywords)
-    matches = [word for word in words if word in keywords_set]
-    return len(matches) > 0
+    # most descriptions hold no keyword at all; reject those in C before the priority scan
+    if index.keys().isdisjoint(words):
+        return None
+    best = None
+    for word in words:
+        priority = index.get(word)
+        if priority is not None and (best is None or priority < best):
+            best = priority
+            if best == 0:
+                break
+    return KEYWORD_CATEGORIES[best][1] if best is not None else None
+
+
+def _load_keyword_index() -> Dict[str, int]:
+    """Return the keyword index, rebuilding it only when keywords.json has changed on disk."""
+    global _keyword_index
+    keywords = _cached_json(KEYWORDS_JSON)
+    if _keyword_index is None or _keyword_index[0] is not keywords:
+        _keyword_index = (keywords, build_keyword_index(keywords))
+        _detect_types_cached.cache_clear()
+    return _keyword_index[1]
 
 
 def detect_types(desc: str) -> tuple[str, str]:
-    """Detect main_type and sub_type for a given description."""
+    """Detect main_type and sub_type for a given description.
+
+    Results are memoized per normalized description; the cache is cleared whenever
+    the types data or keywords are reloaded.
+    """
+    return _detect_types_cached(desc.lower().strip())
+
+
+@lru_cache(maxsize=4096)
+def _detect_types_cached(desc_lower: str) -> tuple[str, str]:
+    """Detect types for an already lowercased and stripped description."""
     try:
-        desc_lower = desc.lower()
-        
         # Load keywords for quick detection
         try:
-            with open("keywords.json", 'r') as file:
-                keywords = json.load(file)
-            
-            if match_keywords(desc_lower, keywords.get("food", [])):
-                return "Food", "Outside Food/Dining/Snacks"
-            if match_keywords(desc_lower, keywords.get("groceries", [])):
-                return "Household", "Groceries"
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+            keyword_types = match_keyword_types(desc_lower, _load_keyword_index())
+            if keyword_types:
+                return keyword_types
+        except (FileNotFoundError, orjson.JSONDecodeError) as e:
             logger.warning(f"Keywords file error: {e}")
         
         # Load types data cache
@@ -775,10 +970,11 @@ def detect_types(desc: str) -> tuple[str, str]:
             item = _data_cache.get(desc_lower)
             return item.get("main_type", ""), item.get("sub_type", "")
         
-        # Fuzzy match
-        for cached_desc, item in _data_cache.items():
-            if fuzz.ratio(cached_desc, desc_lower) > FUZZY_MATCH_THRESHOLD:
-                return item.get("main_type", ""), item.get("sub_type", "")
+        # Fuzzy match: best-scoring cached description at or above the threshold
+        hit = process.extractOne(desc_lower, _data_cache_keys, scorer=fuzz.ratio, score_cutoff=FUZZY_MATCH_THRESHOLD)
+        if hit:
+            item = _data_cache.get(hit[0], {})
+            return item.get("main_type", ""), item.get("sub_type", "")
         
         return "", ""
     except Exception as e:
@@ -786,28 +982,64 @@ def detect_types(desc: str) -> tuple[str, str]:
         return "", ""
 
 
+def _sum_amounts(numbers: List[str]) -> str:
+    """Add up the amounts of one expense line, so the sheet receives a value rather than a formula.
+
+    A single amount is returned exactly as typed; several are summed as decimals, so no digits are lost.
+    """
+    if len(numbers) == 1:
+        return numbers[0]
+    return str(sum(Decimal(number) for number in numbers))
+
+
+def _invalid_lines(text: str) -> List[str]:
+    """Return an "Invalid format" error for every non-blank line in text."""
+    return [f"Invalid format: {line.strip()}" for line in text.splitlines() if line.strip()]
+
+
+def parse_expense_lines(text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Parse one expense per line into (amount, description) entries and "Invalid format" errors.
+
+    Pure function with no I/O, so it can be reused for bulk imports.
+    """
+    entries = []
+    errors = []
+    # one scan over the whole message; the text between matches holds the invalid lines
+    position = 0
+    for match in _EXPENSE_LINES_RE.finditer(text):
+        errors.extend(_invalid_lines(text[position:match.start()]))
+        try:
+            entries.append((_sum_amounts(match.group(2).split()), match.group(1)))
+        except InvalidOperation:
+            errors.extend(_invalid_lines(match.group(0)))
+        position = match.end()
+    errors.extend(_invalid_lines(text[position:]))
+    return entries, errors
+
+
 @restricted
 async def end_conv(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     show_markup = context.user_data.get('show_markup', False)
     user = update.message.from_user
     text = update.message.text
-    pattern = r'^([a-zA-Z0-9 ]+?)\s+((?:\d+(?:\.\d+)?\s*)+)$'
 
     if show_markup:
         # Conversation flow: single line only
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
+        match = _EXPENSE_RE.match(text)
+        try:
+            amount = _sum_amounts(match.group(2).split()) if match else None
+        except InvalidOperation:
+            amount = None
+        if amount is not None:
             description = match.group(1)
-            numbers = match.group(2).split()
-            amount = "=" + "+".join(numbers)
         else:
             logger.error("not a valid format so repeating the question")
             await update.message.reply_text(
                 "Invalid format. Try again!"
             )
             return 0
-        result = update_google_sheet(amount, description, user.first_name)
-        if result.__contains__("Error!"):
+        ok, result = await asyncio.to_thread(update_google_sheet, amount, description, user.first_name)
+        if not ok:
             await update.message.reply_text(
                 result, reply_markup=ReplyKeyboardRemove(),
             )
@@ -823,28 +1055,20 @@ async def end_conv(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         return 1
     else:
         # Direct input: support multiple lines
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        if not lines:
+        if not text.strip():
             await update.message.reply_text(
                 "If you are trying to log an expense, your input is invalid. Try again! "
                 "\n\n If not, /cancel to stop otherwise, I will be stuck in a loop 🙁 "
             )
             return 0
         results = []
-        errors = []
-        for line in lines:
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                description = match.group(1)
-                numbers = match.group(2).split()
-                amount = "=" + "+".join(numbers)
-                result = update_google_sheet(amount, description, user.first_name)
-                if isinstance(result, str) and result.__contains__("Error!"):
-                    errors.append(f"{description}: {result}")
-                else:
-                    results.append(description)
+        entries, errors = parse_expense_lines(text)
+        if entries:
+            ok, result = await asyncio.to_thread(update_google_sheet_batch, entries, user.first_name)
+            if not ok:
+                errors.extend(f"{description}: {result}" for _, description in entries)
             else:
-                errors.append(f"Invalid format: {line}")
+                results.extend(description for _, description in entries)
         if results:
             await update.message.reply_text(
                 f"Okay! I have noted down your expenses: {', '.join(results)}. Enjoy your day 😊 ", reply_markup=ReplyKeyboardRemove()
@@ -905,4 +1129,4 @@ if bot_builder:
 # if __name__ == "__main__":
 #    import uvicorn
 
-#    uvicorn.run(app="bot:app", host="0.0.0.0", port=8080)
+#    uvicorn.run(app="bot:app", host="0.0.0.0", port=8080, loop="uvloop")
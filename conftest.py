@@ -0,0 +1,38 @@
+"""
+Shared pytest fixtures for the Expense Bot tests.
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolate_bot_state(monkeypatch):
+    """Start every test with empty module-level caches in bot; tests install their own data."""
+    import bot
+
+    monkeypatch.setattr(bot, "_data_cache", {})
+    monkeypatch.setattr(bot, "_data_cache_keys", [])
+    monkeypatch.setattr(bot, "_file_cache", {})
+    monkeypatch.setattr(bot, "_keyword_index", None)
+    bot._detect_types_cached.cache_clear()
+    yield
+    bot._detect_types_cached.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """FastAPI test client shared by every endpoint test; the app lifespan runs once per session."""
+    from fastapi.testclient import TestClient
+    from bot import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def types_cache():
+    """Categorized descriptions in the shape of the bot's _data_cache."""
+    return {
+        "pizza hut": {"main_type": "Food", "sub_type": "Outside Food"},
+        "starbucks coffee": {"main_type": "Food", "sub_type": "Beverages"}
+    }
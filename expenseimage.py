@@ -1,4 +1,4 @@
-import time
+from io import BytesIO
 
 from PIL import Image, ImageDraw, ImageFont
 
@@ -11,13 +11,30 @@ headers = ["Description", "Amount", "Main Type", "Sub Type"]
 
 FONT_PATH = "/Courier.ttc"
 FONT_SIZE = 18
-font = ImageFont.truetype(FONT_PATH, FONT_SIZE)
+# plain ASCII rows need no complex text shaping, so skip Raqm even when it is installed
+font = ImageFont.truetype(FONT_PATH, FONT_SIZE, layout_engine=ImageFont.Layout.BASIC)
 
 row_height = 40
 col_widths = [250, 100, 140, 300]
 padding = 20
 
 width = sum(col_widths) + 2 * padding
+# multiline_text advances by the height of "A" plus spacing, so this keeps rows row_height apart
+line_spacing = row_height - font.getbbox("A")[3]
+
+
+def _render_header():
+    header = Image.new("RGB", (width, padding + row_height), color="white")
+    draw = ImageDraw.Draw(header)
+    x = padding
+    for i, title in enumerate(headers):
+        draw.text((x, padding), title, font=font, fill="black", align="center", stroke_width=1, stroke_fill="blue")
+        x += col_widths[i]
+    return header
+
+
+# the header row never changes, so render it once and paste it into every image
+header_image = _render_header()
 
 
 def create_image(today_expenses: list = None):
@@ -34,24 +51,19 @@ def create_image(today_expenses: list = None):
 
     height = (len(data) + 2) * row_height + 2 * padding
     img = Image.new("RGB", (width, height), color="white")
+    img.paste(header_image, (0, 0))
     draw = ImageDraw.Draw(img)
-    x = padding
-    y = padding
 
-    for i, header in enumerate(headers):
-        draw.text((x, y), header, font=font, fill="black", align="center", stroke_width=1, stroke_fill="blue")
+    # one multiline_text call per column rather than one draw.text call per cell
+    y = padding + row_height
+    x = padding
+    for i, column in enumerate(zip(*data)):
+        draw.multiline_text((x, y), "\n".join(str(cell) for cell in column), font=font, fill="black",
+                            spacing=line_spacing)
         x += col_widths[i]
 
-    y += row_height
-    for row in data:
-        x = padding
-        for i, cell in enumerate(row):
-            draw.text((x, y), str(cell), font=font, fill="black")
-            x += col_widths[i]
-        y += row_height
-
-    # Save image
-    name = f"expense_summary{time.time()}.png"
-    img.save(name)
-    print("Image saved as :", name)
-    return name
+    # Encode in memory for upload; low compression keeps encoding fast for this small image
+    buffer = BytesIO()
+    img.save(buffer, format="PNG", compress_level=1)
+    buffer.seek(0)
+    return buffer
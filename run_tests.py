@@ -11,7 +11,7 @@ import argparse
 from pathlib import Path
 
 
-def run_tests(test_type="all", coverage=True, verbose=True):
+def run_tests(test_type="all", coverage=True, verbose=True, parallel=False):
     """
     Run tests based on the specified type.
     
@@ -19,21 +19,19 @@ def run_tests(test_type="all", coverage=True, verbose=True):
         test_type (str): Type of tests to run - 'unit', 'integration', or 'all'
         coverage (bool): Whether to generate coverage reports
         verbose (bool): Whether to run tests in verbose mode
+        parallel (bool): Whether to spread test classes across CPU cores with pytest-xdist
     """
     
     # Ensure we're in the correct directory
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
     
-    # Check if we have a virtual environment
+    # Use the project virtual environment when it exists and we are not already running in it
     venv_python = script_dir / ".venv" / "bin" / "python"
-    if venv_python.exists():
-        python_cmd = str(venv_python)
-    else:
-        python_cmd = "python3"
+    use_venv = venv_python.exists() and Path(sys.prefix).resolve() != venv_python.parent.parent.resolve()
     
-    # Base pytest command
-    cmd = [python_cmd, "-m", "pytest"]
+    # pytest arguments
+    cmd = []
     
     # Add test files based on type
     if test_type == "unit":
@@ -59,24 +57,35 @@ def run_tests(test_type="all", coverage=True, verbose=True):
     if verbose:
         cmd.append("-v")
     
+    # Keep each test class on one worker so class-level fixtures are built once
+    if parallel:
+        cmd.extend(["-n", "auto", "--dist=loadscope"])
+    
     # Add other useful options
     cmd.extend([
         "--tb=short",
         "--strict-markers"
     ])
     
-    print(f"Running command: {' '.join(cmd)}")
+    if use_venv:
+        # the venv has its own packages, so pytest has to run under its interpreter
+        cmd = [str(venv_python), "-m", "pytest"] + cmd
+        print(f"Running command: {' '.join(cmd)}")
+        returncode = subprocess.run(cmd).returncode
+    else:
+        # run in this interpreter to skip a second interpreter start-up and re-import
+        import pytest
+        print(f"Running pytest {' '.join(cmd)}")
+        returncode = int(pytest.main(cmd))
     
-    try:
-        result = subprocess.run(cmd, check=True)
+    if returncode == 0:
         print("\n✅ All tests passed!")
         
         if coverage:
             print("\n📊 Coverage report generated in htmlcov/index.html")
-            
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ Tests failed with exit code: {e.returncode}")
-        sys.exit(e.returncode)
+    else:
+        print(f"\n❌ Tests failed with exit code: {returncode}")
+        sys.exit(returncode)
 
 
 def install_test_dependencies():
@@ -123,6 +132,11 @@ def main():
         action="store_true",
         help="Install test dependencies before running tests"
     )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Run tests in parallel across CPU cores (requires pytest-xdist)"
+    )
     parser.add_argument(
         "--quiet", 
         action="store_true",
@@ -139,7 +153,8 @@ def main():
     run_tests(
         test_type=args.type,
         coverage=not args.no_coverage,
-        verbose=not args.quiet
+        verbose=not args.quiet,
+        parallel=args.parallel
     )
 
 
@@ -13,7 +13,7 @@ SHEET_ID = "1py8E66ipuJSlonFGDUGtejEI1WDWS5MEDRyuEisXOOE"
 RANGE = "June!A2:D2"
 
 
-def update_google_sheet(exp_type, amount, user):
+def update_google_sheet(description, amount, user):
     creds = None
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
@@ -30,7 +30,7 @@ def update_google_sheet(exp_type, amount, user):
             token.write(creds.to_json())
 
     service = build("sheets", "v4", credentials=creds)
-    values = [datetime.date, amount, exp_type, user],
+    values = [[datetime.date.today().isoformat(), amount, description, user]]
 
     body = {"values": values}
     result = (
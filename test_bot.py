@@ -3,547 +3,866 @@ Unit tests for the Expense Bot functionality.
 Tests cover main areas including configuration, expense handling, reminders, and API endpoints.
 """
 
-import asyncio
 import json
 import os
-import tempfile
-import unittest
-from datetime import datetime, timedelta
-from unittest.mock import Mock, patch, MagicMock, mock_open, AsyncMock
-from typing import Dict, List
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, AsyncMock
 
+import orjson
 import pytest
-from fastapi.testclient import TestClient
-from telegram import Update, User, Message, Chat
-from telegram.ext import ContextTypes
+from googleapiclient.errors import HttpError
+from rapidfuzz import fuzz
+from telegram import Bot, Message, Update, User
+from telegram.ext import CallbackContext
 
 # Import the modules to test
+import bot
 from bot import (
-    Config, ExpenseItem, get_expense_data, applicable_reminders,
-    refresh_types_data, get_credit_card_data, detect_types, match_keywords,
-    get_types_data, format_expenses_as_table, ist_date, update_google_sheet,
-    app, restricted, expense_summary, handle_credit_card_reminders
+    Config, ExpenseItem, FUZZY_MATCH_THRESHOLD, get_expense_data, get_expense_dates_amounts, get_expense_types, applicable_reminders,
+    refresh_types_data, get_credit_card_data, get_sheet_batch, detect_types,
+    build_keyword_index, match_keyword_types, _load_keyword_index,
+    get_types_data, format_expenses_as_table, format_reminders, expenses_for_date, ist_date, update_google_sheet,
+    update_google_sheet_batch,
+    restricted, handle_credit_card_reminders, broadcast_messages, process_reminders_job, reminders_command, get_creds, end_conv,
+    parse_expense_lines, _sum_amounts
 )
 
 
-class TestConfig(unittest.TestCase):
-    """Test the Config class initialization and validation."""
-    
-    def setUp(self):
-        """Set up test environment variables."""
-        self.original_env = os.environ.copy()
-        
-    def tearDown(self):
-        """Restore original environment variables."""
-        os.environ.clear()
-        os.environ.update(self.original_env)
-    
-    def test_config_initialization_with_required_env(self):
-        """Test Config initialization with required environment variables."""
-        os.environ.update({
-            'bot_token': 'test_token',
-            'webhook_url': 'https://test.com',
-            'google_sheet_id': 'test_sheet_id'
-        })
-        
-        config = Config()
-        
-        self.assertEqual(config.token, 'test_token')
-        self.assertEqual(config.webhook_url, 'https://test.com')
-        self.assertEqual(config.google_sheet_id, 'test_sheet_id')
-        self.assertFalse(config.is_local)
-        self.assertEqual(len(config.users), 2)
-    
-    def test_config_missing_required_token(self):
-        """Test Config raises error when bot_token is missing."""
-        with self.assertRaises(ValueError) as context:
-            Config()
-        
-        self.assertIn("bot_token environment variable is required", str(context.exception))
-    
-    def test_config_local_environment(self):
-        """Test Config behavior in local environment."""
-        os.environ.update({
-            'bot_token': 'test_token',
-            'local': 'true'
-        })
-        
-        config = Config()
-        
-        self.assertTrue(config.is_local)
-        self.assertEqual(config.current_month, "Test")
-        self.assertEqual(len(config.users), 1)
-        self.assertEqual(config.users[0]['name'], "Gopi")
-
-
-class TestExpenseItem(unittest.TestCase):
-    """Test the ExpenseItem class."""
-    
-    def test_expense_item_initialization(self):
-        """Test ExpenseItem initialization with all parameters."""
-        item = ExpenseItem(
-            row_id=10,
-            date="24/07/2025",
-            desc="Coffee",
-            amount="150.50",
-            main_type="Food",
-            sub_type="Beverages",
-            user="Gopi",
-            bot_identified="Yes"
-        )
-        
-        self.assertEqual(item.row_id, 10)
-        self.assertEqual(item.date, "24/07/2025")
-        self.assertEqual(item.desc, "Coffee")
-        self.assertEqual(item.amount, "150.50")
-        self.assertEqual(item.main_type, "Food")
-        self.assertEqual(item.sub_type, "Beverages")
-        self.assertEqual(item.user, "Gopi")
-        self.assertEqual(item.bot_identified, "Yes")
-    
-    def test_expense_item_numeric_amount(self):
-        """Test numeric_amount property conversion."""
-        # Test with comma-separated amount
-        item1 = ExpenseItem(1, "24/07", "Test", "1,500.75")
-        self.assertEqual(item1.numeric_amount, 1500.75)
-        
-        # Test with simple amount
-        item2 = ExpenseItem(2, "24/07", "Test", "250")
-        self.assertEqual(item2.numeric_amount, 250.0)
-        
-        # Test with empty amount
-        item3 = ExpenseItem(3, "24/07", "Test", "")
-        self.assertEqual(item3.numeric_amount, 0.0)
-        
-        # Test with invalid amount
-        item4 = ExpenseItem(4, "24/07", "Test", "invalid")
-        self.assertEqual(item4.numeric_amount, 0.0)
-    
-    def test_expense_item_repr(self):
-        """Test string representation of ExpenseItem."""
-        item = ExpenseItem(1, "24/07", "Coffee", "150", "Food", "Beverages")
-        repr_str = repr(item)
-        
-        self.assertIn("Coffee", repr_str)
-        self.assertIn("150", repr_str)
-        self.assertIn("Food", repr_str)
-        self.assertIn("Beverages", repr_str)
-
-
-class TestUtilityFunctions(unittest.TestCase):
-    """Test utility functions."""
-    
-    def test_ist_date(self):
-        """Test IST date function returns datetime object."""
-        result = ist_date()
-        self.assertIsInstance(result, datetime)
-    
-    def test_match_keywords(self):
-        """Test keyword matching functionality."""
-        # Test positive match
-        self.assertTrue(match_keywords("pizza delivery", ["pizza", "food"]))
-        
-        # Test negative match
-        self.assertFalse(match_keywords("taxi ride", ["food", "pizza"]))
-        
-        # Test case insensitive
-        self.assertTrue(match_keywords("PIZZA order", ["pizza"]))
-        
-        # Test empty keywords
-        self.assertFalse(match_keywords("test", []))
-    
-    def test_format_expenses_as_table(self):
-        """Test expense table formatting."""
-        # Test with expenses
-        expenses = [
-            ExpenseItem(1, "24/07", "Coffee", "150"),
-            ExpenseItem(2, "24/07", "Lunch", "300")
-        ]
-        result = format_expenses_as_table(expenses)
-        
-        self.assertIn("Coffee", result)
-        self.assertIn("Lunch", result)
-        self.assertIn("150", result)
-        self.assertIn("300", result)
-        
-        # Test with empty expenses
-        empty_result = format_expenses_as_table([])
-        self.assertEqual(empty_result, "No expenses to display.")
-
-
-class TestDetectTypes(unittest.TestCase):
-    """Test type detection functionality."""
-    
-    @patch('bot.open', mock_open(read_data='{"food": ["pizza", "coffee"], "groceries": ["milk", "bread"]}'))
-    @patch('bot.get_types_data')
-    @patch('bot._data_cache', {"pizza hut": {"main_type": "Food", "sub_type": "Outside Food"}})
-    def test_detect_types_keyword_match(self, mock_get_types):
-        """Test type detection with keyword matching."""
-        # Test food keyword
-        main_type, sub_type = detect_types("pizza delivery")
-        self.assertEqual(main_type, "Food")
-        self.assertEqual(sub_type, "Outside Food/Dining/Snacks")
-        
-        # Test groceries keyword
-        main_type, sub_type = detect_types("milk and bread")
-        self.assertEqual(main_type, "Household")
-        self.assertEqual(sub_type, "Groceries")
-
-
-class TestDetectTypes(unittest.TestCase):
-    """Test type detection functionality."""
-    
-    def test_detect_types_keyword_match(self):
-        """Test type detection with keyword matching."""
-        with patch('bot._data_cache', {"pizza hut": {"main_type": "Food", "sub_type": "Outside Food"}}), \
-             patch('bot.get_types_data'), \
-             patch('bot.open', mock_open(read_data='{"food": ["pizza", "coffee"], "groceries": ["milk", "bread"]}')):
-            
-            # Test food keyword
-            main_type, sub_type = detect_types("pizza delivery")
-            self.assertEqual(main_type, "Food")
-            self.assertEqual(sub_type, "Outside Food/Dining/Snacks")
-            
-            # Test groceries keyword
-            main_type, sub_type = detect_types("milk and bread")
-            self.assertEqual(main_type, "Household")
-            self.assertEqual(sub_type, "Groceries")
-    
-    def test_detect_types_exact_match(self):
-        """Test type detection with exact cache match."""
-        with patch('bot._data_cache', {"starbucks coffee": {"main_type": "Food", "sub_type": "Beverages"}}), \
-             patch('bot.get_types_data'), \
-             patch('bot.open', side_effect=FileNotFoundError()):
-            
-            main_type, sub_type = detect_types("starbucks coffee")
-            self.assertEqual(main_type, "Food")
-            self.assertEqual(sub_type, "Beverages")
-    
-    def test_detect_types_fuzzy_match(self):
-        """Test type detection with fuzzy matching."""
-        with patch('bot._data_cache', {}), \
-             patch('bot.get_types_data') as mock_get_types, \
-             patch('bot.open', side_effect=FileNotFoundError()), \
-             patch('fuzzywuzzy.process.extractOne', return_value=("food", 85)):
-            
-            mock_get_types.return_value = {
-                'main_types': ['food', 'transport'],
-                'sub_types': {'food': ['restaurant', 'grocery']}
-            }
-            main_type, sub_type = detect_types("resto")
-            # Since we're using mocks, the exact return depends on implementation
-            self.assertIsNotNone(main_type)
-            self.assertIsNotNone(sub_type)
-    
-    def test_detect_types_no_match(self):
-        """Test type detection with no match found."""
-    def test_detect_types_no_match(self):
-        """Test type detection with no match found."""
-        with patch('bot._data_cache', {}), \
-             patch('bot.get_types_data') as mock_get_types, \
-             patch('bot.open', side_effect=FileNotFoundError()):
-            
-            mock_get_types.return_value = {
-                'main_types': ['food', 'transport'],
-                'sub_types': {'food': ['restaurant', 'grocery']}
-            }
-            main_type, sub_type = detect_types("completely_unknown_item")
-            self.assertEqual(main_type, "")
-            self.assertEqual(sub_type, "")
-
-
-class TestApplicableReminders(unittest.TestCase):
-    """Test reminder functionality."""
-    
-    @patch('bot.config')
-    @patch('bot.ist_date')
-    def test_applicable_reminders_success(self, mock_ist_date, mock_config):
-        """Test applicable reminders with valid data."""
-        mock_config.reminders_json = "test_reminders.json"
-        mock_ist_date.return_value.strftime.return_value = "15"
-        
-        reminder_data = [
-            {"desc": "Rent", "date_range": "1-5", "main_type": "Housing", "sub_type": "Rent"},
-            {"desc": "Electricity", "date_range": "10-20", "main_type": "Utilities", "sub_type": "Power"},
-            {"desc": "Internet", "date_range": "25-30", "main_type": "Utilities", "sub_type": "Internet"}
+# Config tests
+
+def test_config_initialization_with_required_env(monkeypatch):
+    """Test Config initialization with required environment variables."""
+    monkeypatch.setenv('bot_token', 'test_token')
+    monkeypatch.setenv('webhook_url', 'https://test.com')
+    monkeypatch.setenv('google_sheet_id', 'test_sheet_id')
+    monkeypatch.setenv('ALLOWED_USER_IDS', '111,222')
+    monkeypatch.setenv('ALLOWED_USER_NAMES', 'Gopi,Manasa')
+    monkeypatch.delenv('local', raising=False)
+    
+    config = Config()
+    
+    assert config.token == 'test_token'
+    assert config.webhook_url == 'https://test.com'
+    assert config.google_sheet_id == 'test_sheet_id'
+    assert not config.is_local
+    assert len(config.users) == 2
+    assert config.ids_allowed_to_chat_with_bot == [111, 222]
+
+
+def test_config_missing_required_token(monkeypatch):
+    """Test Config raises error when bot_token is missing."""
+    monkeypatch.delenv('bot_token', raising=False)
+    
+    with pytest.raises(ValueError, match="bot_token environment variable is required"):
+        Config()
+
+
+def test_config_precomputes_sheet_ranges(monkeypatch):
+    """Test the month-qualified sheet ranges are built once at initialization."""
+    monkeypatch.setenv('bot_token', 'test_token')
+    monkeypatch.setenv('local', 'true')
+    
+    config = Config()
+    
+    assert config.expense_range == "Test!B8:J200"
+    assert config.expense_types_range == "Test!B8:F200"
+    assert config.expense_amounts_range == "Test!B8:D200"
+    assert config.card_range == "Test!T8:W13"
+    assert config.append_range == "Test!B8:E8"
+
+
+def test_config_local_environment(monkeypatch):
+    """Test Config behavior in local environment."""
+    monkeypatch.setenv('bot_token', 'test_token')
+    monkeypatch.setenv('local', 'true')
+    monkeypatch.setenv('LOCAL_TEST_USER_ID', '111')
+    monkeypatch.setenv('LOCAL_TEST_USER_NAME', 'Gopi')
+    
+    config = Config()
+    
+    assert config.is_local
+    assert config.current_month == "Test"
+    assert len(config.users) == 1
+    assert config.users[0]['name'] == "Gopi"
+
+
+# ExpenseItem tests
+
+def test_expense_item_initialization():
+    """Test ExpenseItem initialization with all parameters."""
+    item = ExpenseItem(
+        row_id=10,
+        date="24/07/2025",
+        desc="Coffee",
+        amount="150.50",
+        main_type="Food",
+        sub_type="Beverages",
+        user="Gopi",
+        bot_identified="Yes"
+    )
+    
+    assert item.row_id == 10
+    assert item.date == "24/07/2025"
+    assert item.desc == "Coffee"
+    assert item.amount == "150.50"
+    assert item.main_type == "Food"
+    assert item.sub_type == "Beverages"
+    assert item.user == "Gopi"
+    assert item.bot_identified == "Yes"
+
+
+@pytest.mark.parametrize("amount, expected", [
+    ("1,500.75", 1500.75),  # comma-separated amount
+    ("250", 250.0),         # simple amount
+    ("", 0.0),              # empty amount
+    ("invalid", 0.0),       # invalid amount
+])
+def test_expense_item_numeric_amount(amount, expected):
+    """Test numeric_amount property conversion."""
+    assert ExpenseItem(1, "24/07", "Test", amount).numeric_amount == expected
+
+
+def test_expense_item_uses_slots():
+    """Test ExpenseItem instances carry no per-instance __dict__."""
+    item = ExpenseItem(1, "24/07", "Coffee", "150")
+    
+    assert not hasattr(item, "__dict__")
+    with pytest.raises(AttributeError):
+        item.unknown_field = "value"
+
+
+def test_expense_item_repr():
+    """Test string representation of ExpenseItem."""
+    repr_str = repr(ExpenseItem(1, "24/07", "Coffee", "150", "Food", "Beverages"))
+    
+    assert "Coffee" in repr_str
+    assert "150" in repr_str
+    assert "Food" in repr_str
+    assert "Beverages" in repr_str
+
+
+# Utility function tests
+
+def test_ist_date():
+    """Test IST date function returns datetime object."""
+    assert isinstance(ist_date(), datetime)
+
+
+def test_match_keyword_types():
+    """Test keyword categories are matched in priority order."""
+    index = build_keyword_index({"food": ["Pizza", "coffee"], "groceries": ["milk", "coffee"]})
+    
+    assert index == {"pizza": 0, "coffee": 0, "milk": 1}
+    assert match_keyword_types("Milk and Pizza", index) == ("Food", "Outside Food/Dining/Snacks")
+    assert match_keyword_types("milk packet", index) == ("Household", "Groceries")
+    assert match_keyword_types("taxi ride", index) is None
+
+
+def test_format_expenses_as_table():
+    """Test expense table formatting."""
+    # Test with expenses
+    expenses = [
+        ExpenseItem(1, "24/07", "Coffee", "150"),
+        ExpenseItem(2, "24/07", "Lunch", "300")
+    ]
+    result = format_expenses_as_table(expenses)
+    
+    assert "Coffee" in result
+    assert "Lunch" in result
+    assert "150" in result
+    assert "300" in result
+    
+    # Test with empty expenses
+    assert format_expenses_as_table([]) == "No expenses to display."
+
+
+def test_format_expenses_as_table_alignment():
+    """Test descriptions are left aligned and amounts right aligned."""
+    expenses = [
+        ExpenseItem(1, "24/07", "Coffee", "150"),
+        ExpenseItem(2, "24/07", "Monthly Groceries", "1,300")
+    ]
+    
+    assert format_expenses_as_table(expenses) == (
+        "Description        Amount\n"
+        "Coffee                150\n"
+        "Monthly Groceries   1,300"
+    )
+
+
+def test_format_reminders():
+    """Test reminders are listed one description per line."""
+    reminders = [{"desc": "Rent"}, {"desc": "Cook Salary"}]
+    
+    assert format_reminders(reminders) == "Rent\nCook Salary"
+
+
+def test_sum_amounts():
+    """Test expense amounts are summed locally and formatted for the sheet."""
+    assert _sum_amounts(["150"]) == "150"
+    assert _sum_amounts(["20", "30.5"]) == "50.5"
+    assert _sum_amounts(["0.1", "0.2"]) == "0.3"
+    # a single amount is kept exactly as entered
+    assert _sum_amounts(["1.005"]) == "1.005"
+    assert _sum_amounts(["0.125"]) == "0.125"
+    assert _sum_amounts(["150.50"]) == "150.50"
+    # sums are exact, not rounded to two places
+    assert _sum_amounts(["1.005", "0.125"]) == "1.130"
+
+
+def test_parse_expense_lines():
+    """Test expense lines are parsed into entries and invalid lines into errors."""
+    entries, errors = parse_expense_lines("Coffee 150\n\nbad line\n  Auto 40 25.5  ")
+    
+    assert entries == [("150", "Coffee"), ("65.5", "Auto")]
+    assert errors == ["Invalid format: bad line"]
+    assert parse_expense_lines("") == ([], [])
+    # Windows line endings, also for a single line in the conversation flow
+    assert bot._EXPENSE_RE.match("Coffee 150\r").groups() == ("Coffee", "150")
+    assert parse_expense_lines("Coffee 150\r\nbad line\r\nTea 20\r") == (
+        [("150", "Coffee"), ("20", "Tea")], ["Invalid format: bad line"]
+    )
+    # an indented amount-only line has no description
+    assert parse_expense_lines("Tea 20\n  150\n \t2") == (
+        [("20", "Tea")], ["Invalid format: 150", "Invalid format: 2"]
+    )
+    # amounts must be separated by whitespace, so a mistyped amount is reported instead of summed
+    assert bot._EXPENSE_RE.match("Tea 10.50.5 2") is None
+    assert parse_expense_lines("Tea 20 30\nCoffee 1.21.2 5") == (
+        [("50", "Tea")], ["Invalid format: Coffee 1.21.2 5"]
+    )
+
+
+def test_expenses_for_date():
+    """Test expenses are filtered by date and totalled together."""
+    expenses = [
+        ExpenseItem(1, "24/07", "Coffee", "150"),
+        ExpenseItem(2, "23/07", "Dinner", "400"),
+        ExpenseItem(3, "24/07", "Lunch", "1,300.50")
+    ]
+    
+    today_expenses, total = expenses_for_date(expenses, "24/07")
+    
+    assert [exp.desc for exp in today_expenses] == ["Coffee", "Lunch"]
+    assert total == 1450.50
+    assert expenses_for_date(expenses, "01/01") == ([], 0.0)
+
+
+# Type detection tests
+
+@pytest.mark.parametrize("desc, expected", [
+    ("pizza delivery", ("Food", "Outside Food/Dining/Snacks")),  # food keyword
+    ("milk and bread", ("Household", "Groceries")),              # groceries keyword
+    ("starbucks coffee", ("Food", "Beverages")),                 # exact cache match
+    ("completely_unknown_item", ("", "")),                       # no match
+])
+def test_detect_types(desc, expected, types_cache, monkeypatch):
+    """Test type detection through keywords, the types cache, or no match at all."""
+    monkeypatch.setattr("bot._data_cache", types_cache)
+    monkeypatch.setattr("bot._data_cache_keys", list(types_cache))
+    monkeypatch.setattr("bot.get_types_data", lambda: None)
+    monkeypatch.setattr("bot._load_keyword_index", lambda: build_keyword_index(
+        {"food": ["pizza"], "groceries": ["milk", "bread"]}))
+    
+    assert detect_types(desc) == expected
+
+
+def test_detect_types_fuzzy_match(monkeypatch):
+    """Test type detection with fuzzy matching."""
+    cache = {"restaurant": {"main_type": "Food", "sub_type": "Outside Food"}}
+    mock_extract = Mock(return_value=("restaurant", 85.0, 0))
+    monkeypatch.setattr("bot._data_cache", cache)
+    monkeypatch.setattr("bot._data_cache_keys", list(cache))
+    monkeypatch.setattr("bot.get_types_data", lambda: None)
+    monkeypatch.setattr("bot._load_keyword_index", lambda: {})
+    monkeypatch.setattr("bot.process.extractOne", mock_extract)
+    
+    assert detect_types("resto") == ("Food", "Outside Food")
+    mock_extract.assert_called_once_with(
+        "resto", ["restaurant"], scorer=fuzz.ratio, score_cutoff=FUZZY_MATCH_THRESHOLD
+    )
+
+
+def test_detect_types_fuzzy_match_best_candidate(monkeypatch):
+    """Test fuzzy matching picks the closest cached description."""
+    cache = {
+        "starbucks coffee": {"main_type": "Food", "sub_type": "Beverages"},
+        "uber ride": {"main_type": "Transport", "sub_type": "Cab"}
+    }
+    monkeypatch.setattr("bot._data_cache", cache)
+    monkeypatch.setattr("bot._data_cache_keys", list(cache))
+    monkeypatch.setattr("bot.get_types_data", lambda: None)
+    monkeypatch.setattr("bot._load_keyword_index", lambda: {})
+    
+    assert detect_types("starbucks cofee") == ("Food", "Beverages")
+    assert detect_types("uber rides") == ("Transport", "Cab")
+
+
+def test_detect_types_missing_keywords_file(types_cache, monkeypatch):
+    """Test type detection falls back to the types cache without keywords.json."""
+    monkeypatch.setattr("bot._data_cache", types_cache)
+    monkeypatch.setattr("bot.get_types_data", lambda: None)
+    monkeypatch.setattr("bot._load_keyword_index", Mock(side_effect=FileNotFoundError()))
+    
+    assert detect_types("pizza hut") == ("Food", "Outside Food")
+
+
+def test_keyword_index_rebuilt_only_on_change(tmp_path, monkeypatch):
+    """Test keywords.json is parsed once and re-read only after it changes."""
+    keywords_path = tmp_path / "keywords.json"
+    keywords_path.write_text(json.dumps({"food": ["pizza"], "groceries": ["milk"]}))
+    mock_build = Mock(wraps=build_keyword_index)
+    monkeypatch.setattr("bot.KEYWORDS_JSON", str(keywords_path))
+    monkeypatch.setattr("bot.build_keyword_index", mock_build)
+    
+    assert _load_keyword_index() == {"pizza": 0, "milk": 1}
+    _load_keyword_index()
+    assert mock_build.call_count == 1
+    
+    keywords_path.write_text(json.dumps({"food": ["burger"]}))
+    stat = keywords_path.stat()
+    os.utime(keywords_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    assert _load_keyword_index() == {"burger": 0}
+    assert mock_build.call_count == 2
+
+
+def test_detect_types_is_memoized(types_cache, monkeypatch):
+    """Test repeated descriptions are served from the memo cache."""
+    mock_get_types = Mock()
+    monkeypatch.setattr("bot._data_cache", types_cache)
+    monkeypatch.setattr("bot.get_types_data", mock_get_types)
+    monkeypatch.setattr("bot._load_keyword_index", lambda: {})
+    
+    assert detect_types("starbucks coffee") == ("Food", "Beverages")
+    assert detect_types("  Starbucks Coffee ") == ("Food", "Beverages")
+    mock_get_types.assert_called_once()
+
+
+# Reminder tests
+
+@pytest.fixture(scope="session")
+def reminder_data():
+    """Parsed contents of a reminders file."""
+    return [
+        {"desc": "Rent", "date_range": "1-5", "main_type": "Housing", "sub_type": "Rent"},
+        {"desc": "Electricity", "date_range": "10-20", "main_type": "Utilities", "sub_type": "Power"},
+        {"desc": "Internet", "date_range": "25-30", "main_type": "Utilities", "sub_type": "Internet"}
+    ]
+
+
+def test_applicable_reminders_success(reminder_data, monkeypatch):
+    """Test applicable reminders with valid data."""
+    monkeypatch.setattr("bot.config", SimpleNamespace(reminders_json="reminders.json"))
+    monkeypatch.setattr("bot.ist_date", lambda: datetime(2025, 7, 15))
+    monkeypatch.setattr("bot._cached_json", lambda path: reminder_data)
+    
+    result = applicable_reminders()
+    
+    # Should return only the electricity reminder (day 15 is in range 10-20)
+    assert len(result) == 1
+    assert result[0]['desc'] == "Electricity"
+
+
+def test_applicable_reminders_file_not_found(monkeypatch):
+    """Test applicable reminders when file doesn't exist."""
+    monkeypatch.setattr("bot.config", SimpleNamespace(reminders_json="nonexistent.json"))
+    
+    assert applicable_reminders() == []
+
+
+def test_applicable_reminders_file_read_cached(tmp_path, monkeypatch):
+    """Test the reminders file is parsed again only after it changes."""
+    monkeypatch.setattr("bot.ist_date", lambda: datetime(2025, 7, 15))
+    reminder = {"desc": "Rent", "date_range": "1-31", "main_type": "Housing", "sub_type": "Rent"}
+    reminders_path = tmp_path / "reminders.json"
+    reminders_path.write_text(json.dumps([reminder]))
+    monkeypatch.setattr("bot.config", SimpleNamespace(reminders_json=str(reminders_path)))
+    mock_load = Mock(wraps=orjson.loads)
+    monkeypatch.setattr("bot.orjson.loads", mock_load)
+    
+    applicable_reminders()
+    applicable_reminders()
+    assert mock_load.call_count == 1
+    
+    reminders_path.write_text(json.dumps([reminder, dict(reminder, desc="Power")]))
+    stat = reminders_path.stat()
+    os.utime(reminders_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    result = applicable_reminders()
+    
+    assert mock_load.call_count == 2
+    assert len(result) == 2
+
+
+# Google Sheets tests
+
+@pytest.fixture
+def sheets_service(monkeypatch):
+    """Mocked Sheets client returned by bot.build; tests only set the execute results they need."""
+    service = Mock()
+    monkeypatch.setattr("bot.config", SimpleNamespace(
+        google_sheet_id="test_sheet_id",
+        expense_range="July!B8:J200",
+        expense_types_range="July!B8:F200",
+        expense_amounts_range="July!B8:D200",
+        card_range="July!T8:W13",
+        append_range="July!B8:E8"
+    ))
+    monkeypatch.setattr("bot._sheets_service", None)
+    monkeypatch.setattr("bot.build", Mock(return_value=service))
+    monkeypatch.setattr("bot.get_creds", Mock())
+    return service
+
+
+def test_get_expense_data_success(sheets_service):
+    """Test successful expense data retrieval."""
+    sheets_service.spreadsheets().values().get().execute.return_value = {
+        "values": [
+            ["24/07", "Coffee", "150", "Food", "Beverages", "Gopi", "Yes"],
+            ["24/07", "Lunch", "300", "Food", "Meals", "Manasa", "No"]
         ]
-        
-        with patch('bot.open', mock_open(read_data=json.dumps(reminder_data))):
-            result = applicable_reminders()
-        
-        # Should return only the electricity reminder (day 15 is in range 10-20)
-        self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]['desc'], "Electricity")
-    
-    @patch('bot.config')
-    def test_applicable_reminders_file_not_found(self, mock_config):
-        """Test applicable reminders when file doesn't exist."""
-        mock_config.reminders_json = "nonexistent.json"
-        
-        with patch('bot.open', side_effect=FileNotFoundError()):
-            result = applicable_reminders()
-        
-        self.assertEqual(result, [])
-
-
-class TestGoogleSheetsIntegration(unittest.TestCase):
-    """Test Google Sheets integration functions."""
-    
-    @patch('bot.get_creds')
-    @patch('bot.build')
-    @patch('bot.config')
-    def test_get_expense_data_success(self, mock_config, mock_build, mock_get_creds):
-        """Test successful expense data retrieval."""
-        mock_config.current_month = "July"
-        mock_config.google_sheet_id = "test_sheet_id"
-        
-        mock_service = Mock()
-        mock_build.return_value = mock_service
-        
-        # Mock Google Sheets API response
-        mock_response = {
-            "values": [
-                ["24/07", "Coffee", "150", "Food", "Beverages", "Gopi", "Yes"],
-                ["24/07", "Lunch", "300", "Food", "Meals", "Manasa", "No"]
-            ]
-        }
-        mock_service.spreadsheets().values().get().execute.return_value = mock_response
-        
-        result = get_expense_data()
-        
-        self.assertIsInstance(result, list)
-        self.assertEqual(len(result), 2)
-        self.assertEqual(result[0].desc, "Coffee")
-        self.assertEqual(result[1].desc, "Lunch")
-    
-    @patch('bot.get_creds')
-    @patch('bot.build')
-    @patch('bot.config')
-    def test_get_expense_data_api_error(self, mock_config, mock_build, mock_get_creds):
-        """Test expense data retrieval with API error."""
-        from googleapiclient.errors import HttpError
-        
-        mock_config.current_month = "July"
-        mock_config.google_sheet_id = "test_sheet_id"
-        
-        mock_service = Mock()
-        mock_build.return_value = mock_service
-        mock_service.spreadsheets().values().get().execute.side_effect = HttpError(
-            resp=Mock(status=403), content=b'API Error'
-        )
-        
-        result = get_expense_data()
-        
-        self.assertIsInstance(result, str)
-        self.assertIn("Google Sheets API Error", result)
-
-
-class TestAsyncFunctions(unittest.IsolatedAsyncioTestCase):
-    """Test async functions using asyncio test case."""
-    
-    async def test_refresh_types_data_success(self):
-        """Test successful types data refresh."""
-        mock_bot = AsyncMock()
-        
-        with patch('bot.get_expense_data') as mock_get_data, \
-             patch('bot.config') as mock_config, \
-             patch('bot.os.path.exists', return_value=True), \
-             patch('bot.open', mock_open(read_data='[]')), \
-             patch('bot.ist_date') as mock_ist_date, \
-             patch('bot.bot_builder') as mock_bot_builder:
-            
-            mock_bot_builder.bot = mock_bot
-            mock_config.types_data_json = "test_types.json"
-            mock_config.users = [{"id": 123, "name": "Test"}]
-            mock_config.ids_allowed_to_chat_with_bot = [123]
-            
-            mock_get_data.return_value = [
-                ExpenseItem(1, "24/07", "Coffee", "150", "Food", "Beverages", "Test", "No")
-            ]
-            mock_ist_date.return_value.strftime.return_value = "24/07"
-            mock_ist_date.return_value.day = 15
-            
-            result = await refresh_types_data()
-            
-            self.assertEqual(result["status"], "success")
-    
-    async def test_handle_credit_card_reminders(self):
-        """Test credit card reminders handling."""
-        mock_bot = AsyncMock()
-        
-        with patch('bot.get_credit_card_data') as mock_get_cards, \
-             patch('bot.ist_date') as mock_ist_date, \
-             patch('bot.config') as mock_config, \
-             patch('bot.bot_builder') as mock_bot_builder:
-            
-            mock_bot_builder.bot = mock_bot
-            mock_config.ids_allowed_to_chat_with_bot = [123]
-            mock_ist_date.return_value.strftime.return_value = "24/07"
-            
-            # Mock credit card data with due date today
-            mock_get_cards.return_value = [
-                {"name": "HDFC", "due_date": "24/07", "amount": "5000", "status": "unpaid"}
-            ]
-            
-            await handle_credit_card_reminders(None)
-            
-            # Should send reminder message
-            mock_bot.send_message.assert_called_once()
-            args = mock_bot.send_message.call_args
-            self.assertIn("HDFC", args[1]['text'])
-            self.assertIn("due today", args[1]['text'])
-
-
-class TestAPIEndpoints(unittest.TestCase):
-    """Test FastAPI endpoints."""
-    
-    def setUp(self):
-        """Set up test client."""
-        self.client = TestClient(app)
-    
-    @patch('bot.config')
-    def test_types_refresh_api_unauthorized(self, mock_config):
-        """Test types refresh API with invalid token."""
-        mock_config.scheduler_token = "valid_token"
-        
-        response = self.client.get(
-            "/types_refresh",
-            headers={"X-Secret-Token": "invalid_token"}
-        )
-        
-        self.assertEqual(response.status_code, 401)
-    
-    @patch('bot.config')
-    @patch('bot.refresh_types_data', new_callable=AsyncMock)
-    async def test_types_refresh_api_success(self, mock_refresh, mock_config):
-        """Test types refresh API with valid token."""
-        mock_config.scheduler_token = "valid_token"
-        mock_refresh.return_value = {"status": "success"}
-        
-        response = self.client.get(
-            "/types_refresh",
-            headers={"X-Secret-Token": "valid_token"}
-        )
-        
-        self.assertEqual(response.status_code, 200)
-    
-    @patch('bot.config')
-    def test_process_update_unauthorized(self, mock_config):
-        """Test process update with invalid secret token."""
-        mock_config.secret_token = "valid_secret"
-        
-        response = self.client.post(
-            "/bot",
-            json={"test": "data"},
-            headers={"X-Telegram-Bot-Api-Secret-Token": "invalid_secret"}
-        )
-        
-        self.assertEqual(response.status_code, 401)
-
-
-class TestRestricted(unittest.TestCase):
-    """Test the restricted decorator."""
-    
-    def test_restricted_decorator_authorized_user(self):
-        """Test restricted decorator allows authorized users."""
-        with patch('bot.config') as mock_config:
-            mock_config.ids_allowed_to_chat_with_bot = [123456]
-            
-            # Create mock function
-            @restricted
-            def test_function(update, context):
-                return "success"
-            
-            # Create mock update with authorized user
-            mock_update = Mock()
-            mock_update.effective_user.id = 123456
-            mock_update.effective_user.first_name = "Test"
-            
-            result = test_function(mock_update, None)
-            self.assertEqual(result, "success")
-    
-    def test_restricted_decorator_unauthorized_user(self):
-        """Test restricted decorator blocks unauthorized users."""
-        with patch('bot.config') as mock_config:
-            mock_config.ids_allowed_to_chat_with_bot = [123456]
-            
-            @restricted
-            def test_function(update, context):
-                return "success"
-            
-            # Create mock update with unauthorized user
-            mock_update = Mock()
-            mock_update.effective_user.id = 999999
-            mock_update.effective_user.first_name = "Unauthorized"
-            
-            result = test_function(mock_update, None)
-            self.assertIsNone(result)
-
-
-class TestUpdateGoogleSheet(unittest.TestCase):
-    """Test Google Sheet update functionality."""
-    
-    @patch('bot.get_creds')
-    @patch('bot.build')
-    @patch('bot.detect_types')
-    @patch('bot.ist_date')
-    @patch('bot.config')
-    def test_update_google_sheet_success(self, mock_config, mock_ist_date, 
-                                       mock_detect_types, mock_build, mock_get_creds):
-        """Test successful Google Sheet update."""
-        mock_config.current_month = "July"
-        mock_config.sheet_range = "!B8:E8"
-        mock_config.google_sheet_id = "test_sheet"
-        
-        mock_ist_date.return_value.strftime.return_value = "24/07/2025"
-        mock_detect_types.return_value = ("Food", "Beverages")
-        
-        mock_service = Mock()
-        mock_build.return_value = mock_service
-        mock_service.spreadsheets().values().append().execute.return_value = {
-            "updates": {"updatedRange": "July!B8:H8"}
-        }
-        
-        result = update_google_sheet("150", "Coffee", "Gopi")
-        
-        self.assertIsInstance(result, dict)
-        self.assertIn("updates", result)
-
-
-class TestGetTypesData(unittest.TestCase):
-    """Test types data loading functionality."""
-    
-    @patch('bot.config')
-    @patch('bot._data_cache', {})
-    def test_get_types_data_success(self, mock_config):
-        """Test successful types data loading."""
-        mock_config.types_data_json = "test_types.json"
-        
-        types_data = [
-            {"desc": "Coffee", "main_type": "Food", "sub_type": "Beverages"},
-            {"desc": "Taxi", "main_type": "Transport", "sub_type": "Cab"}
+    }
+    
+    result = get_expense_data()
+    
+    assert isinstance(result, list)
+    assert [exp.desc for exp in result] == ["Coffee", "Lunch"]
+
+
+def test_get_expense_data_api_error(sheets_service):
+    """Test expense data retrieval with API error."""
+    sheets_service.spreadsheets().values().get().execute.side_effect = HttpError(
+        resp=Mock(status=403), content=b'API Error'
+    )
+    
+    result = get_expense_data()
+    
+    assert isinstance(result, str)
+    assert "Google Sheets API Error" in result
+
+
+def test_get_sheet_batch_success(sheets_service):
+    """Test expenses and credit cards are fetched in one batch request."""
+    sheets_service.spreadsheets().values().batchGet().execute.return_value = {
+        "valueRanges": [
+            {"values": [["24/07", "Coffee", "150", "Food", "Beverages", "Gopi", "Yes"]]},
+            {"values": [["24/07", "HDFC", "5000", "unpaid"]]}
         ]
-        
-        with patch('bot.open', mock_open(read_data=json.dumps(types_data))):
-            get_types_data()
-        
-        from bot import _data_cache
-        self.assertIn("coffee", _data_cache)
-        self.assertIn("taxi", _data_cache)
-    
-    @patch('bot.config')
-    @patch('bot._data_cache', {})
-    def test_get_types_data_file_not_found(self, mock_config):
-        """Test types data loading when file doesn't exist."""
-        mock_config.types_data_json = "nonexistent.json"
-        
-        with patch('bot.open', side_effect=FileNotFoundError()):
-            get_types_data()  # Should not raise exception
-        
-        from bot import _data_cache
-        self.assertEqual(len(_data_cache), 0)
-
-
-if __name__ == '__main__':
-    # Run tests
-    unittest.main(verbosity=2)
+    }
+    
+    expenses, cards = get_sheet_batch()
+    
+    assert [exp.desc for exp in expenses] == ["Coffee"]
+    assert cards == [{"name": "HDFC", "due_date": "24/07", "amount": "5000", "status": "unpaid"}]
+    sheets_service.spreadsheets().values().get.assert_not_called()
+
+
+def test_get_expense_projections(sheets_service):
+    """Test the projection helpers only request the columns they need."""
+    values_api = sheets_service.spreadsheets().values()
+    values_api.get().execute.return_value = {"values": [["24/07", "Coffee", "150"]]}
+    
+    result = get_expense_dates_amounts()
+    assert values_api.get.call_args.kwargs["range"] == "July!B8:D200"
+    assert result[0].numeric_amount == 150.0
+    assert result[0].main_type == ""
+    
+    get_expense_types()
+    assert values_api.get.call_args.kwargs["range"] == "July!B8:F200"
+
+
+def test_sheets_service_is_reused(sheets_service):
+    """Test the Sheets client is built once and reused across calls."""
+    sheets_service.spreadsheets().values().get().execute.return_value = {"values": []}
+    
+    get_expense_data()
+    get_credit_card_data()
+    
+    bot.build.assert_called_once()
+    bot.get_creds.assert_called_once()
+
+
+def test_update_google_sheet_success(sheets_service, monkeypatch):
+    """Test successful Google Sheet update."""
+    monkeypatch.setattr("bot.ist_date", lambda: datetime(2025, 7, 24))
+    monkeypatch.setattr("bot.detect_types", Mock(return_value=("Food", "Beverages")))
+    sheets_service.spreadsheets().values().append().execute.return_value = {
+        "updates": {"updatedRange": "July!B8:H8"}
+    }
+    
+    ok, result = update_google_sheet("150", "Coffee", "Gopi")
+    
+    assert ok
+    assert isinstance(result, dict)
+    assert "updates" in result
+
+
+def test_update_google_sheet_api_error(sheets_service, monkeypatch):
+    """Test API failures are reported as not ok with the error message."""
+    monkeypatch.setattr("bot.ist_date", lambda: datetime(2025, 7, 24))
+    monkeypatch.setattr("bot.detect_types", Mock(return_value=("", "")))
+    sheets_service.spreadsheets().values().append().execute.side_effect = HttpError(
+        resp=Mock(status=403), content=b'API Error'
+    )
+    
+    ok, result = update_google_sheet("150", "Coffee", "Gopi")
+    
+    assert not ok
+    assert "Google Sheets API Error" in result
+
+
+def test_update_google_sheet_batch_single_append(sheets_service, monkeypatch):
+    """Test several expenses are written with one append request."""
+    monkeypatch.setattr("bot.ist_date", lambda: datetime(2025, 7, 24))
+    monkeypatch.setattr("bot.detect_types", Mock(side_effect=[("Food", "Beverages"), ("", "")]))
+    
+    values_api = sheets_service.spreadsheets().values()
+    values_api.append().execute.return_value = {"updates": {"updatedRange": "July!B8:H9"}}
+    values_api.append.reset_mock()
+    
+    update_google_sheet_batch([("150", "Coffee"), ("50", "Parking")], "Gopi")
+    
+    values_api.append.assert_called_once()
+    assert values_api.append.call_args.kwargs["body"] == {"values": [
+        ["24/07/2025", "Coffee", "150", "Food", "Beverages", "Gopi", "Yes"],
+        ["24/07/2025", "Parking", "50", "", "", "Gopi", "No"]
+    ]}
+
+
+# Google credentials tests
+
+def test_get_creds_reads_secret_once(monkeypatch):
+    """Test Secret Manager is only queried on the first call."""
+    mock_secretmanager = Mock()
+    mock_service_account = Mock()
+    monkeypatch.setattr("bot._creds", None)
+    monkeypatch.setattr("bot.service_account", mock_service_account)
+    monkeypatch.setattr("bot.secretmanager", mock_secretmanager)
+    monkeypatch.setattr("bot.config", SimpleNamespace(
+        is_local=False, gcp_project_id="project", gcp_secret_id="secret", scopes=[]
+    ))
+    client = mock_secretmanager.SecretManagerServiceClient.return_value
+    client.access_secret_version.return_value.payload.data = b'{"type": "service_account"}'
+    mock_creds = mock_service_account.Credentials.from_service_account_info.return_value
+    mock_creds.expired = False
+    
+    assert get_creds() is mock_creds
+    assert get_creds() is mock_creds
+    
+    client.access_secret_version.assert_called_once()
+    mock_creds.refresh.assert_not_called()
+
+
+def test_get_creds_refreshes_expired_token(monkeypatch):
+    """Test cached credentials are refreshed in place once expired."""
+    mock_google_request = Mock()
+    mock_creds = Mock(expired=True)
+    monkeypatch.setattr("bot.GoogleRequest", mock_google_request)
+    monkeypatch.setattr("bot.config", SimpleNamespace(is_local=False))
+    monkeypatch.setattr("bot._creds", mock_creds)
+    
+    assert get_creds() is mock_creds
+    
+    mock_creds.refresh.assert_called_once_with(mock_google_request.return_value)
+
+
+def test_get_creds_caches_local_credentials(monkeypatch):
+    """Test token.json credentials are loaded once in the local environment."""
+    mock_get_local_creds = Mock(return_value=Mock(expired=False))
+    monkeypatch.setattr("bot._creds", None)
+    monkeypatch.setattr("bot.get_local_creds", mock_get_local_creds)
+    monkeypatch.setattr("bot.config", SimpleNamespace(is_local=True))
+    
+    assert get_creds() is mock_get_local_creds.return_value
+    assert get_creds() is mock_get_local_creds.return_value
+    
+    mock_get_local_creds.assert_called_once()
+
+
+# Scheduled job tests
+
+@pytest.fixture
+def bot_env(monkeypatch, tmp_path):
+    """Patch the bot, config and clock shared by the scheduled job tests."""
+    types_path = tmp_path / "types.json"
+    types_path.write_bytes(b"[]")
+    env = SimpleNamespace(
+        bot=AsyncMock(),
+        config=SimpleNamespace(
+            types_data_json=str(types_path),
+            users=[{"id": 123, "name": "Test"}],
+            ids_allowed_to_chat_with_bot=[123]
+        ),
+        today=datetime(2025, 7, 24)
+    )
+    monkeypatch.setattr(bot, "bot_builder", SimpleNamespace(bot=env.bot))
+    monkeypatch.setattr(bot, "config", env.config)
+    monkeypatch.setattr(bot, "ist_date", lambda: env.today)
+    return env
+
+
+@pytest.fixture(scope="session")
+def card_data():
+    """Credit cards as returned by get_credit_card_data, with HDFC due on the bot_env date."""
+    return [
+        {"name": "HDFC", "due_date": "24/07", "amount": "5000", "status": "unpaid"}
+    ]
+
+
+async def test_refresh_types_data_success(bot_env, monkeypatch):
+    """Test successful types data refresh."""
+    monkeypatch.setattr(bot, "get_expense_data", Mock(return_value=[
+        ExpenseItem(1, "24/07", "Coffee", "150", "Food", "Beverages", "Test", "No")
+    ]))
+    
+    result = await refresh_types_data()
+    
+    assert result["status"] == "success"
+    with open(bot_env.config.types_data_json, "rb") as file:
+        saved = orjson.loads(file.read())
+    assert [item["desc"] for item in saved] == ["Coffee"]
+    bot_env.bot.send_message.assert_not_called()
+
+
+async def test_refresh_types_data_merges_new_types(bot_env, monkeypatch):
+    """Test new types are merged once, ignoring case and already known descriptions."""
+    with open(bot_env.config.types_data_json, "wb") as file:
+        file.write(orjson.dumps([{"desc": "Coffee", "main_type": "Food", "sub_type": "Beverages"}]))
+    bot_env.config.users = []
+    monkeypatch.setattr(bot, "get_expense_data", Mock(return_value=[
+        ExpenseItem(1, "24/07", "coffee", "150", "Food", "Snacks", "Test", "No"),
+        ExpenseItem(2, "24/07", "Taxi", "200", "Transport", "Cab", "Test", "No"),
+        ExpenseItem(3, "24/07", "TAXI", "250", "Transport", "Cab", "Test", "No"),
+        ExpenseItem(4, "24/07", "Pizza", "300", "Food", "Outside Food", "Test", "Yes"),
+    ]))
+    
+    result = await refresh_types_data()
+    
+    assert result["status"] == "success"
+    with open(bot_env.config.types_data_json, "rb") as file:
+        saved = orjson.loads(file.read())
+    assert [item["desc"] for item in saved] == ["Coffee", "Taxi"]
+    assert saved[0]["sub_type"] == "Beverages"
+
+
+async def test_refresh_types_data_skips_write_without_new_types(bot_env, monkeypatch):
+    """Test the types file is left untouched when nothing new was categorized."""
+    with open(bot_env.config.types_data_json, "wb") as file:
+        file.write(orjson.dumps([{"desc": "Coffee", "main_type": "Food", "sub_type": "Beverages"}]))
+    bot_env.config.users = []
+    monkeypatch.setattr(bot, "get_expense_data", Mock(return_value=[
+        ExpenseItem(1, "24/07", "COFFEE", "150", "Food", "Beverages", "Test", "No"),
+        ExpenseItem(2, "24/07", "Pizza", "300", "Food", "Outside Food", "Test", "Yes"),
+    ]))
+    mock_write = Mock()
+    monkeypatch.setattr(bot, "_write_json_atomic", mock_write)
+    
+    result = await refresh_types_data()
+    
+    assert result["status"] == "success"
+    assert "coffee" in bot._data_cache
+    mock_write.assert_not_called()
+
+
+async def test_refresh_types_data_nudges_users_without_expenses(bot_env, monkeypatch):
+    """Test only users with no expense logged today get the nudge."""
+    bot_env.config.users = [{"id": 1, "name": "Gopi"}, {"id": 2, "name": "Manasa"}]
+    monkeypatch.setattr(bot, "get_expense_data", Mock(return_value=[
+        ExpenseItem(1, "24/07", "Coffee", "150", user="GOPI"),
+        ExpenseItem(2, "23/07", "Lunch", "300", user="Manasa")
+    ]))
+    
+    await refresh_types_data()
+    
+    bot_env.bot.send_message.assert_called_once()
+    assert bot_env.bot.send_message.call_args.kwargs["chat_id"] == 2
+
+
+async def test_handle_credit_card_reminders(bot_env, card_data, monkeypatch):
+    """Test credit card reminders handling."""
+    monkeypatch.setattr(bot, "get_credit_card_data", Mock(return_value=card_data))
+    
+    await handle_credit_card_reminders(None)
+    
+    # Should send reminder message
+    bot_env.bot.send_message.assert_called_once()
+    text = bot_env.bot.send_message.call_args.kwargs['text']
+    assert "HDFC" in text
+    assert "due today" in text
+
+
+async def test_broadcast_messages_continues_after_failure(bot_env):
+    """Test a failed send does not stop messages to other chats."""
+    bot_env.bot.send_message.side_effect = [Exception("Forbidden"), None]
+    
+    await broadcast_messages([(1, "first"), (2, "second")])
+    
+    assert bot_env.bot.send_message.call_count == 2
+    bot_env.bot.send_message.assert_any_call(chat_id=2, text="second", parse_mode="HTML")
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+async def test_end_conv_multi_line_input(newline, bot_env, monkeypatch):
+    """Test valid lines are logged together and invalid lines are reported, for either line ending."""
+    user = Mock(spec=User, id=123, first_name="Gopi")
+    mock_update = Mock(spec=Update, effective_user=user)
+    mock_update.message = Mock(
+        spec=Message, from_user=user, text=newline.join(["Coffee 150", "", "  bad line", "Tea 20 30", "Juice 1.21.2 5", "10"]), reply_text=AsyncMock()
+    )
+    mock_context = Mock(spec=CallbackContext, user_data={})
+    mock_context.bot = Mock(spec=Bot, send_message=AsyncMock())
+    mock_batch = Mock(return_value=(True, {}))
+    monkeypatch.setattr(bot, "update_google_sheet_batch", mock_batch)
+    
+    await end_conv(mock_update, mock_context)
+    
+    mock_batch.assert_called_once_with([("150", "Coffee"), ("50", "Tea")], "Gopi")
+    replies = [call.args[0] for call in mock_update.message.reply_text.call_args_list]
+    assert "Coffee, Tea" in replies[0]
+    assert replies[1] == (
+        "Some items could not be added:\nInvalid format: bad line\nInvalid format: Juice 1.21.2 5\nInvalid format: 10"
+    )
+
+
+async def test_process_reminders_job_sheet_error(bot_env, monkeypatch):
+    """Test a failed sheet fetch skips the expense reminders instead of matching against the error."""
+    monkeypatch.setattr(bot, "get_sheet_batch", Mock(return_value=("Error! boom", [])))
+    monkeypatch.setattr(bot, "applicable_reminders", Mock(return_value=[
+        {"desc": "Rent", "main_type": "Housing", "sub_type": "Rent"}
+    ]))
+    
+    response = await process_reminders_job(None)
+    
+    assert response.status_code == 200
+    bot_env.bot.send_message.assert_not_called()
+
+
+async def test_reminders_command_sheet_error(bot_env, monkeypatch):
+    """Test /reminders replies with the fetch error and still runs the card reminders."""
+    monkeypatch.setattr(bot, "get_sheet_batch", Mock(return_value=("Error! boom", [])))
+    monkeypatch.setattr(bot, "applicable_reminders", Mock(return_value=[
+        {"desc": "Rent", "main_type": "Housing", "sub_type": "Rent"}
+    ]))
+    mock_cards = AsyncMock()
+    monkeypatch.setattr(bot, "handle_credit_card_reminders", mock_cards)
+    user = Mock(spec=User, id=123, first_name="Gopi")
+    mock_update = Mock(spec=Update, effective_user=user)
+    mock_update.message = Mock(spec=Message, from_user=user, reply_text=AsyncMock())
+    
+    await reminders_command(mock_update, None)
+    
+    mock_update.message.reply_text.assert_awaited_once_with("An error occurred while fetching expenses! Error! boom")
+    mock_cards.assert_awaited_once_with(mock_update, [])
+
+
+async def test_sheet_reads_run_off_the_event_loop(bot_env, monkeypatch):
+    """Test reminder sheet reads run in a worker thread, so the loop never waits on the Sheets lock."""
+    read_threads = []
+    
+    def fake_batch():
+        read_threads.append(threading.current_thread())
+        return [], []
+    
+    monkeypatch.setattr(bot, "get_sheet_batch", fake_batch)
+    monkeypatch.setattr(bot, "applicable_reminders", Mock(return_value=[]))
+    
+    await process_reminders_job(None)
+    
+    assert read_threads and read_threads[0] is not threading.current_thread()
+
+
+# API endpoint tests
+
+def test_types_refresh_api_unauthorized(client, monkeypatch):
+    """Test types refresh API with invalid token."""
+    monkeypatch.setattr(bot, "config", SimpleNamespace(scheduler_token="valid_token"))
+    
+    response = client.get(
+        "/types_refresh",
+        headers={"X-Secret-Token": "invalid_token"}
+    )
+    
+    assert response.status_code == 401
+
+
+def test_types_refresh_api_success(client, monkeypatch):
+    """Test types refresh API with valid token."""
+    monkeypatch.setattr(bot, "config", SimpleNamespace(scheduler_token="valid_token"))
+    mock_refresh = AsyncMock(return_value={"status": "success"})
+    monkeypatch.setattr(bot, "refresh_types_data", mock_refresh)
+    
+    response = client.get(
+        "/types_refresh",
+        headers={"X-Secret-Token": "valid_token"}
+    )
+    
+    assert response.status_code == 200
+    mock_refresh.assert_awaited_once()
+
+
+def test_process_update_unauthorized(client, monkeypatch):
+    """Test process update with invalid secret token."""
+    monkeypatch.setattr(bot, "config", SimpleNamespace(secret_token="valid_secret"))
+    
+    response = client.post(
+        "/bot",
+        json={"test": "data"},
+        headers={"X-Telegram-Bot-Api-Secret-Token": "invalid_secret"}
+    )
+    
+    assert response.status_code == 401
+
+
+# Restricted decorator tests
+
+@pytest.mark.parametrize("user_id, first_name, expected", [
+    (123456, "Test", "success"),         # authorized user
+    (999999, "Unauthorized", None),     # unauthorized user is blocked
+])
+def test_restricted_decorator(user_id, first_name, expected, monkeypatch):
+    """Test the restricted decorator only lets authorized users through."""
+    monkeypatch.setattr("bot.config", SimpleNamespace(ids_allowed_to_chat_with_bot=[123456]))
+    
+    @restricted
+    def test_function(update, context):
+        return "success"
+    
+    mock_update = Mock(spec=Update)
+    mock_update.effective_user = Mock(spec=User, id=user_id, first_name=first_name)
+    
+    assert test_function(mock_update, None) == expected
+
+
+# Types data tests
+
+@pytest.fixture(scope="module")
+def types_data():
+    """Parsed contents of a types data file."""
+    return [
+        {"desc": "Coffee", "main_type": "Food", "sub_type": "Beverages"},
+        {"desc": "Taxi", "main_type": "Transport", "sub_type": "Cab"}
+    ]
+
+
+def test_get_types_data_success(types_data, monkeypatch):
+    """Test successful types data loading."""
+    monkeypatch.setattr("bot.config", SimpleNamespace(types_data_json="types_data.json"))
+    monkeypatch.setattr("bot._cached_json", lambda path: types_data)
+    
+    get_types_data()
+    
+    from bot import _data_cache
+    assert "coffee" in _data_cache
+    assert "taxi" in _data_cache
+
+
+def test_get_types_data_file_not_found(monkeypatch):
+    """Test types data loading when file doesn't exist."""
+    monkeypatch.setattr("bot.config", SimpleNamespace(types_data_json="nonexistent.json"))
+    
+    get_types_data()  # Should not raise exception
+    
+    from bot import _data_cache
+    assert len(_data_cache) == 0